@@ -0,0 +1,236 @@
+"""
+Benchmark the crossword solver in generate.py.
+
+Usage: python benchmark.py [--sizes N [N ...]] [--words FILE] [--time-limit T]
+                           [--results FILE] [--baseline FILE] [--tolerance T]
+
+Every combination of the structures and word lists in data/ is solved,
+followed by synthetic square grids of each size, built by laying words
+from a word list across each other so that they are known to have a
+solution. Each run records its time, whether it found a solution and the
+solver's counters of search effort.
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from crossword import Crossword, WordIndex
+from generate import CrosswordCreator
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+SIZES = [9, 15, 21, 25]
+SEED = 0
+TIME_LIMIT = 60
+
+# Words to try placing in a synthetic grid, per cell of the grid
+ATTEMPTS = 50
+
+
+def runs(grid):
+    """
+    Return the set of `(i, j, across, length)` runs of two or more
+    letters in `grid`, a list of rows of letters or None.
+    """
+    found = set()
+    height, width = len(grid), len(grid[0])
+    for across in (True, False):
+        for i in range(height):
+            for j in range(width):
+                if grid[i][j] is None:
+                    continue
+                before = (i, j - 1) if across else (i - 1, j)
+                if min(before) >= 0 and grid[before[0]][before[1]] is not None:
+                    continue
+                length = 0
+                while (i + (0 if across else length) < height
+                       and j + (length if across else 0) < width
+                       and grid[i + (0 if across else length)]
+                               [j + (length if across else 0)] is not None):
+                    length += 1
+                if length > 1:
+                    found.add((i, j, across, length))
+    return found
+
+
+def synthetic_structure(n, words, seed=SEED):
+    """
+    Return the rows of an `n` by `n` crossword structure, in the format
+    of the structure files, built by placing distinct words from `words`
+    so that each crosses a word already placed, and every run of letters
+    in the grid is a placed word.
+    """
+    rng = random.Random(seed)
+    words = sorted(word for word in words if 3 <= len(word) <= n)
+    grid = [[None] * n for _ in range(n)]
+    placed = dict()
+
+    first = rng.choice(words)
+    i, j = rng.randrange(n), rng.randrange(n - len(first) + 1)
+    for k, letter in enumerate(first):
+        grid[i][j + k] = letter
+    placed[i, j, True, len(first)] = first
+
+    for _ in range(ATTEMPTS * n * n):
+        # Cross a random letter of a random word with another word
+        (i, j, across, length), word = rng.choice(list(placed.items()))
+        k = rng.randrange(length)
+        ci, cj = (i, j + k) if across else (i + k, j)
+        candidate = rng.choice(words)
+        if candidate in placed.values() or grid[ci][cj] not in candidate:
+            continue
+        offset = candidate.index(grid[ci][cj])
+        si, sj = (ci - offset, cj) if across else (ci, cj - offset)
+        cells = [
+            (si + m, sj) if across else (si, sj + m)
+            for m in range(len(candidate))
+        ]
+        if min(min(cell) for cell in cells) < 0 or max(
+            max(cell) for cell in cells
+        ) >= n:
+            continue
+        if any(grid[a][b] not in (None, letter)
+               for (a, b), letter in zip(cells, candidate)):
+            continue
+
+        # Keep the word only if it creates no other runs of letters
+        trial = [row.copy() for row in grid]
+        for (a, b), letter in zip(cells, candidate):
+            trial[a][b] = letter
+        slot = (si, sj, not across, len(candidate))
+        if runs(trial) == set(placed) | {slot}:
+            grid = trial
+            placed[slot] = candidate
+
+    return ["".join("#" if cell is None else "_" for cell in row) for row in grid]
+
+
+def problems(sizes, words, seed=SEED):
+    """
+    Yield `(name, structure file, words file)` for each problem, writing
+    synthetic structures to temporary files.
+    """
+    structures = sorted(glob.glob(os.path.join(DATA, "structure*.txt")))
+    word_lists = sorted(glob.glob(os.path.join(DATA, "words*.txt")))
+    for structure in structures:
+        for word_list in word_lists:
+            name = (f"{os.path.basename(structure)[:-4]}/"
+                    f"{os.path.basename(word_list)[:-4]}")
+            yield name, structure, word_list
+
+    vocabulary = WordIndex.open(words).words
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            structure = os.path.join(directory, f"synthetic{n}.txt")
+            with open(structure, "w") as f:
+                f.write("\n".join(synthetic_structure(n, vocabulary, seed)))
+            yield f"synthetic{n}/{os.path.basename(words)[:-4]}", structure, words
+
+
+def run(sizes, words, seed=SEED, time_limit=TIME_LIMIT):
+    """
+    Solve every problem, and return a list of result dictionaries, one
+    per problem.
+    """
+    results = []
+    for name, structure, word_list in problems(sizes, words, seed):
+        crossword = Crossword(structure, word_list)
+        creator = CrosswordCreator(crossword, stats=True)
+        creator.deadline = time.monotonic() + time_limit
+        start = time.perf_counter()
+        try:
+            assignment = creator.solve()
+            result = {"problem": name, "solved": assignment is not None}
+        except TimeoutError:
+            result = {"problem": name, "timeout": True}
+        result["seconds"] = time.perf_counter() - start
+        result["variables"] = len(crossword.variables)
+        result["words"] = len(crossword.index)
+        result.update(creator.stats)
+        results.append(result)
+        report(result)
+    return results
+
+
+def report(result):
+    """Print a single benchmark result."""
+    if result.get("timeout"):
+        outcome = "timeout"
+    else:
+        outcome = "solved" if result["solved"] else "no solution"
+    print(
+        f"{result['problem']:>24} {result['variables']:>4} vars: "
+        f"{result['seconds']:8.3f}s {outcome:>11}  "
+        f"{result.get('nodes', 0):>7} nodes "
+        f"{result.get('backtracks', 0):>7} backtracks "
+        f"{result.get('arcs_revised', 0):>8} arcs "
+        f"{result.get('values_pruned', 0):>9} pruned  "
+        f"ac3 {result.get('ac3_seconds', 0):.3f}s "
+        f"consistent {result.get('consistent_seconds', 0):.3f}s",
+        flush=True,
+    )
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Return descriptions of results that are slower than `tolerance`
+    times, or reach a different outcome from, the matching entry in
+    `baseline`.
+    """
+    previous = {r["problem"]: r for r in baseline}
+    found = []
+    for result in results:
+        old = previous.get(result["problem"])
+        if not old:
+            continue
+        if result.get("solved") != old.get("solved"):
+            found.append(
+                f"{result['problem']}: solved {result.get('solved')}, "
+                f"baseline {old.get('solved')}"
+            )
+        elif result["seconds"] > old["seconds"] * tolerance:
+            found.append(
+                f"{result['problem']} took {result['seconds']:.3f}s, "
+                f"baseline {old['seconds']:.3f}s"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES,
+                        help="sizes of synthetic grids to benchmark")
+    parser.add_argument("--words", default=os.path.join(DATA, "words2.txt"),
+                        help="word list or index for synthetic grids")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT,
+                        help="seconds allowed for each problem")
+    parser.add_argument("--results", help="write results to this JSON file")
+    parser.add_argument("--baseline",
+                        help="compare against results from a previous run")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown relative to the baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.words, args.seed, args.time_limit)
+
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"Regression: {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
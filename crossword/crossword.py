@@ -1,3 +1,11 @@
+import bisect
+import mmap
+import struct
+import sys
+from functools import cached_property
+from types import MappingProxyType
+
+
 class Variable:
 
     ACROSS = "across"
@@ -37,8 +45,240 @@ class Variable:
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+def bitset(indices, size):
+    """
+    Return an integer with the bits at each of `indices` set, where every
+    index is less than `size`.
+    """
+    bits = bytearray((size + 7) // 8)
+    for k in indices:
+        bits[k >> 3] |= 1 << (k & 7)
+    return int.from_bytes(bits, "little")
+
+
+def members(bits):
+    """Return the indices of the bits set in integer `bits`, in order."""
+    return [k for k, bit in enumerate(reversed(bin(bits)[2:])) if bit == "1"]
+
+
+class WordIndex:
+    """
+    Vocabulary indexed for pattern queries.
+
+    Words are numbered in order of length and then alphabetically, so the
+    words of each length have consecutive numbers. Sets of words are
+    bitsets of word numbers: integers whose bit `k` is set if
+    `self.words[k]` is in the set. For each length, position and letter,
+    the index has a posting list of the words of that length with that
+    letter at that position, stored as a bitset over the words of that
+    length, so an index file can be mapped into memory and only the
+    posting lists that are used read from it.
+    """
+
+    MAGIC = b"CWINDEX1"
+
+    # Header: magic, number of words, lengths and posting lists, and size
+    # of the newline-separated words; then (length, first word number,
+    # number of words) per length, and (length, position, letter code
+    # point, offset, size) per posting list
+    HEADER = struct.Struct("<8sIIIQ")
+    LENGTH = struct.Struct("<III")
+    POSTING = struct.Struct("<IIIQI")
+
+    # Character matching any letter in patterns
+    BLANK = "_"
+
+    def __init__(self, words):
+        """Index the words in iterable `words`."""
+        self.words = sorted(set(words), key=lambda word: (len(word), word))
+        self.ranges = dict()
+        postings = dict()
+        for k, word in enumerate(self.words):
+            start, _ = self.ranges.get(len(word), (k, k))
+            self.ranges[len(word)] = (start, k + 1)
+            for position, letter in enumerate(word):
+                postings.setdefault(
+                    (len(word), position), dict()
+                ).setdefault(letter, []).append(k)
+
+        self.postings = {
+            (length, position): {
+                letter: self.posting(length, numbers)
+                for letter, numbers in by_letter.items()
+            }
+            for (length, position), by_letter in postings.items()
+        }
+        self.mapped = None
+
+        # Posting lists read so far as bitsets, by length and position
+        self.bitsets = dict()
+
+    def posting(self, length, numbers):
+        """
+        Return the bytes of the posting list of words `numbers`, all of
+        length `length`, as a bitset over the words of that length.
+        """
+        start, stop = self.ranges[length]
+        return bitset((k - start for k in numbers), stop - start).to_bytes(
+            (stop - start + 7) // 8, "little"
+        )
+
+    def __len__(self):
+        return len(self.words)
+
+    def number(self, word):
+        """
+        Return the number of `word`, found by binary search among the
+        words of its length. Raise KeyError if it is not in the index.
+        """
+        start, stop = self.ranges.get(len(word), (0, 0))
+        k = bisect.bisect_left(self.words, word, start, stop)
+        if k == stop or self.words[k] != word:
+            raise KeyError(word)
+        return k
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Return the index of `filename`, either an index file written by
+        `save` or a word list with one word per line.
+        """
+        with open(filename, "rb") as f:
+            if f.read(len(cls.MAGIC)) == cls.MAGIC:
+                return cls.load(filename)
+        with open(filename) as f:
+            return cls(f.read().upper().splitlines())
+
+    @classmethod
+    def load(cls, filename):
+        """Map index file `filename`, written by `save`, into memory."""
+        with open(filename, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, words, lengths, postings, size = cls.HEADER.unpack_from(mapped)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{filename} is not a word index")
+
+        index = cls.__new__(cls)
+        index.mapped = mapped
+        index.bitsets = dict()
+        offset = cls.HEADER.size
+        index.ranges = dict()
+        for length, start, count in cls.LENGTH.iter_unpack(
+            mapped[offset:offset + lengths * cls.LENGTH.size]
+        ):
+            index.ranges[length] = (start, start + count)
+        offset += lengths * cls.LENGTH.size
+
+        index.postings = dict()
+        for length, position, letter, start, count in cls.POSTING.iter_unpack(
+            mapped[offset:offset + postings * cls.POSTING.size]
+        ):
+            index.postings.setdefault((length, position), dict())[
+                chr(letter)
+            ] = (start, count)
+        offset += postings * cls.POSTING.size
+
+        text = mapped[offset:offset + size].decode()
+        index.words = text.split("\n") if words else []
+        return index
+
+    def save(self, filename):
+        """Write the index to `filename`, for `load` to map into memory."""
+        text = "\n".join(self.words).encode()
+        entries = [
+            (length, position, letter, self.letter_bytes(length, position, letter))
+            for (length, position), by_letter in sorted(self.postings.items())
+            for letter in sorted(by_letter)
+        ]
+        offset = (self.HEADER.size + len(self.ranges) * self.LENGTH.size
+                  + len(entries) * self.POSTING.size + len(text))
+        with open(filename, "wb") as f:
+            f.write(self.HEADER.pack(
+                self.MAGIC, len(self.words), len(self.ranges), len(entries),
+                len(text)
+            ))
+            for length, (start, stop) in sorted(self.ranges.items()):
+                f.write(self.LENGTH.pack(length, start, stop - start))
+            for length, position, letter, data in entries:
+                f.write(self.POSTING.pack(
+                    length, position, ord(letter), offset, len(data)
+                ))
+                offset += len(data)
+            f.write(text)
+            for *_, data in entries:
+                f.write(data)
+
+    def letter_bytes(self, length, position, letter):
+        """
+        Return the bytes of the posting list of words of length `length`
+        with `letter` at `position`.
+        """
+        data = self.postings[length, position][letter]
+        if isinstance(data, tuple):
+            start, count = data
+            data = self.mapped[start:start + count]
+        return data
+
+    def length_bits(self, length):
+        """Return the bitset of words of length `length`."""
+        start, stop = self.ranges.get(length, (0, 0))
+        return ((1 << (stop - start)) - 1) << start
+
+    def letter_bits(self, length, position):
+        """
+        Return a dictionary mapping each letter to the bitset of words of
+        length `length` with that letter at `position`.
+        """
+        key = length, position
+        if key not in self.postings:
+            return dict()
+        bitsets = self.bitsets.get(key)
+        if bitsets is None:
+            start, _ = self.ranges[length]
+            bitsets = self.bitsets[key] = {
+                letter: int.from_bytes(
+                    self.letter_bytes(length, position, letter), "little"
+                ) << start
+                for letter in self.postings[key]
+            }
+        return bitsets
+
+    def match(self, pattern):
+        """
+        Return the bitset of words matching `pattern`, in which
+        `WordIndex.BLANK` matches any letter, such as "C_T__".
+        """
+        bits = self.length_bits(len(pattern))
+        for position, letter in enumerate(pattern):
+            if letter != self.BLANK and bits:
+                bits &= self.letter_bits(len(pattern), position).get(letter, 0)
+        return bits
+
+    def query(self, pattern):
+        """Return the words matching `pattern`, as for `match`."""
+        return [self.words[k] for k in members(self.match(pattern))]
+
+    def count(self, pattern):
+        """Return the number of words matching `pattern`, as for `match`."""
+        return self.match(pattern).bit_count()
+
+
+class Overlaps(dict):
+    """
+    Overlaps between pairs of variables, storing only the pairs that
+    overlap; any other pair of variables does not overlap, so is None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword:
-    def __init__(self, structure_file, words_file):
+    def __init__(self, structure_file, words_file, index=None):
+        """
+        Load the crossword in `structure_file` with the words in
+        `words_file`, or in the prebuilt `WordIndex` `index` if given.
+        """
 
         # Determine structure of crossword
         with open(structure_file) as f:
@@ -58,9 +298,10 @@ class Crossword:
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, from a word list or a prebuilt word index
+        self.index = index
+        if self.index is None:
+            self.index = WordIndex.open(words_file)
 
         # Determine variable set
         self.variables = set()
@@ -103,23 +344,56 @@ class Crossword:
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection),
-                    )
+        # Only overlapping pairs are stored, found through the variables
+        # sharing each cell
+        sharing = dict()
+        for variable in self.variables:
+            for k, cell in enumerate(variable.cells):
+                sharing.setdefault(cell, []).append((variable, k))
+        self.overlaps = Overlaps()
+        adjacency = {variable: dict() for variable in self.variables}
+        for variables in sharing.values():
+            for v1, i in variables:
+                for v2, j in variables:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        adjacency[v1][v2] = (i, j)
+
+        # Map each variable to a read-only mapping from its neighbors to
+        # their overlaps with it, and to the set of its neighbors
+        self.adjacency = MappingProxyType({
+            variable: MappingProxyType(neighbors)
+            for variable, neighbors in adjacency.items()
+        })
+        self._neighbors = MappingProxyType({
+            variable: frozenset(neighbors)
+            for variable, neighbors in adjacency.items()
+        })
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(v for v in self.variables if v != var and self.overlaps[v, var])
+        return self._neighbors[var]
+
+    @cached_property
+    def words(self):
+        """
+        The set of words in the vocabulary, built on first use since the
+        solver works with the index instead.
+        """
+        return set(self.index.words)
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python crossword.py words index")
+
+    # Build a word index from a word list, for loading with `Crossword`
+    index = WordIndex.open(sys.argv[1])
+    index.save(sys.argv[2])
+    print(f"Indexed {len(index)} words of {len(index.ranges)} lengths")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,139 @@
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import random
 import sys
-import copy
+import time
 
+import render
 from crossword import *
 
 
+# Backtracks allowed in the first run of a restarting search, which are
+# multiplied by the terms of the Luby sequence in later runs
+RESTART_BASE = 100
+
+
+def luby(i):
+    """
+    Return the `i`th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2,
+    4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    if i == (1 << k) - 1:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+class Restart(Exception):
+    """Raised when a search exceeds its backtrack limit."""
+
+
 class CrosswordCreator:
-    def __init__(self, crossword):
+
+    # Heuristics for choosing the next variable and ordering its values
+    VARIABLE_ORDERS = ["domwdeg", "mrv"]
+    VALUE_ORDERS = ["lcv", "domain", "random"]
+
+    def __init__(self, crossword, variable_order="domwdeg", value_order="lcv",
+                 seed=None, restart_base=None, stats=False):
         """
         Create new CSP crossword generate.
+
+        Each domain is a bitset of word numbers in the crossword's word
+        index: an integer whose bit `k` is set if `self.words[k]` is in it.
+
+        `variable_order` is "domwdeg", to choose the variable with the
+        smallest domain relative to the weighted degree of its constraints,
+        or "mrv", to choose the one with the fewest remaining values and
+        then the most neighbors. `value_order` is "lcv", to try the least
+        constraining values first, "domain", to try them in word order, or
+        "random", to try them in random order.
+
+        With a `seed`, ties between variables and values are broken at
+        random. With a `restart_base`, the search restarts from scratch
+        after `restart_base` times the next term of the Luby sequence
+        backtracks, keeping the constraint weights learned so far.
+
+        With `stats`, `self.stats` counts the search nodes expanded,
+        backtracks, arcs revised and values pruned, and the seconds spent
+        in `ac3` and in `consistent`.
         """
+        if variable_order not in self.VARIABLE_ORDERS:
+            raise ValueError(f"unknown variable order {variable_order!r}")
+        if value_order not in self.VALUE_ORDERS:
+            raise ValueError(f"unknown value order {value_order!r}")
+        self.variable_order = variable_order
+        self.value_order = value_order
+        self.random = None
+        if seed is not None or value_order == "random":
+            self.random = random.Random(seed)
+        self.restart_base = restart_base
+        self.backtracks = 0
+        self.limit = None
+
         self.crossword = crossword
-        self.domains = {
-            var: self.crossword.words.copy() for var in self.crossword.variables
-        }
+        self.index = self.crossword.index
+        self.words = self.index.words
+
+        everything = (1 << len(self.words)) - 1
+        self.domains = {var: everything for var in self.crossword.variables}
+
+        # Stack of `(var, domain)` pairs recording the domains replaced
+        # during search, so that they can be restored on backtracking
+        self.trail = []
+
+        # Number of times revising each arc `frozenset({x, y})` wiped out a
+        # domain, for weighting the constraints in variable ordering
+        self.failures = collections.Counter()
+
+        # Time (from `time.monotonic`) after which searching raises
+        # TimeoutError, if any
+        self.deadline = None
+
+        # Counters of search effort, if enabled
+        self.stats = None
+        if stats:
+            self.stats = collections.Counter()
+            self.ac3 = self.timed(self.ac3, "ac3_seconds")
+            self.consistent = self.timed(self.consistent, "consistent_seconds")
+
+    def timed(self, method, counter):
+        """
+        Return `method` wrapped to add the time spent in it to
+        `self.stats[counter]`.
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.stats[counter] += time.perf_counter() - start
+        return timed
+
+    def set_domain(self, var, domain):
+        """
+        Replace the domain of `var` with `domain`, recording the old one on
+        the trail.
+        """
+        self.trail.append((var, self.domains[var]))
+        self.domains[var] = domain
+
+    def undo(self, mark):
+        """
+        Restore the domains replaced since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
+
+    def values(self, bits):
+        """Return the words in domain `bits`."""
+        return [self.words[k] for k in members(bits)]
 
     def letter_grid(self, assignment):
         """
@@ -47,47 +168,9 @@ class CrosswordCreator:
         """
         Save crossword assignment to an image file.
         """
-        from PIL import Image, ImageDraw, ImageFont
-
-        cell_size = 100
-        cell_border = 2
-        interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size, self.crossword.height * cell_size),
-            "black",
+        render.save(
+            self.crossword.structure, self.letter_grid(assignment), filename
         )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
-
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border, i * cell_size + cell_border),
-                    (
-                        (j + 1) * cell_size - cell_border,
-                        (i + 1) * cell_size - cell_border,
-                    ),
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
-                        draw.text(
-                            (
-                                rect[0][0] + ((interior_size - w) / 2),
-                                rect[0][1] + ((interior_size - h) / 2) - 10,
-                            ),
-                            letters[i][j],
-                            fill="black",
-                            font=font,
-                        )
-
-        img.save(filename)
 
     def solve(self):
         """
@@ -95,7 +178,29 @@ class CrosswordCreator:
         """
         self.enforce_node_consistency()
         self.ac3()
-        return self.backtrack(dict())
+        if self.restart_base is None:
+            return self.backtrack(dict())
+
+        # * Restarts the search each time it exceeds its backtrack limit
+        mark = len(self.trail)
+        for run in itertools.count(1):
+            self.backtracks = 0
+            self.limit = self.restart_base * luby(run)
+            try:
+                return self.backtrack(dict())
+            except Restart:
+                self.undo(mark)
+
+    def solutions(self):
+        """
+        Enforce node and arc consistency, and then yield every solution of
+        the CSP, each as a new assignment. Searches for all solutions never
+        restart.
+        """
+        self.enforce_node_consistency()
+        if self.ac3():
+            for assignment in self.search(dict()):
+                yield dict(assignment)
 
     def enforce_node_consistency(self):
         """
@@ -103,17 +208,11 @@ class CrosswordCreator:
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        # * Make a deepcopy of domains
-        domains_copy = copy.deepcopy(self.domains)
-
-        # * Loop through every variable in domains
-        for variable in domains_copy:
-            # * Loop through every word in variable
-            for word in domains_copy[variable]:
-                # * Checks whether length of word is greater than the variable length
-                if len(word) != variable.length:
-                    # * If it is, delete word from the current variable words
-                    self.domains[variable].remove(word)
+        # * Keep only the words of the variable's length in each domain
+        for variable in self.domains:
+            self.domains[variable] &= self.index.match(
+                WordIndex.BLANK * variable.length
+            )
 
     def revise(self, x, y):
         """
@@ -126,31 +225,33 @@ class CrosswordCreator:
         """
         # * Finds out the intersection between x and y
         i, j = self.crossword.overlaps[(x, y)]
-
-        # * Makes a copy of domain
-        domains_copy = copy.deepcopy(self.domains)
-
-        # * Sets the inital value of revised to be False
-        revised = False
-
-        # * Gets the words of x and y
-        x_words = domains_copy[x]
-        y_words = domains_copy[y]
-
-        # * Loops through all words in x and y
-        for word1 in x_words:
-            clash = list()
-            for word2 in y_words:
-                if word1 == word2:
-                    continue
-                elif word1[i] != word2[j]:
-                    clash.append(word2)
-            # * Removes the word from x if it is not arc consistent with y and sets revised to True
-            if len(clash) == len(y_words):
-                self.domains[x].remove(word1)
-                revised = True
-
-        return revised
+        if self.stats is not None:
+            self.stats["arcs_revised"] += 1
+
+        # * Collects the words of x whose letter at the overlap is the
+        # * letter of some word of y at the overlap
+        y_domain = self.domains[y]
+        x_letters = self.index.letter_bits(x.length, i)
+        supported = 0
+        for letter, y_letter in self.index.letter_bits(y.length, j).items():
+            y_words = y_domain & y_letter
+            if not y_words:
+                continue
+            x_words = x_letters.get(letter, 0)
+            # * A lone word of y cannot support the same word in x, as
+            # * every word in the puzzle is distinct
+            if y_words & (y_words - 1) == 0:
+                x_words &= ~y_words
+            supported |= x_words
+
+        # * Removes the words of x without support, if there are any
+        domain = self.domains[x] & supported
+        if domain == self.domains[x]:
+            return False
+        if self.stats is not None:
+            self.stats["values_pruned"] += (self.domains[x] ^ domain).bit_count()
+        self.set_domain(x, domain)
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -161,43 +262,31 @@ class CrosswordCreator:
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        # * Make a deepcopy of domain
-        domains_copy = copy.deepcopy(self.domains)
-
-        if arcs:
-            while len(arcs) != 0:
-                x, y = arcs[0]
-                arcs = arcs[1:]
-                if self.revise(x, y):
-                    if len(self.domains[x]) == 0:
-                        return False
-                    for neighbor in self.crossword.neighbors(x):
-                        if neighbor != y:
-                            arcs.append((neighbor, x))
-
-            return True
-
-        # * Initialize a list to contain all the arcs
-        arcs = []
-
-        # * Loops over all variable in domain adds are arcs to a queue
-        for variable in domains_copy:
-            overlaps = self.crossword.neighbors(variable)
-            for overlap in overlaps:
-                arcs.append((variable, overlap))
-
-        # * Calls revise all arcs
-        while len(arcs) != 0:
-            x, y = arcs[0]
-            arcs = arcs[1:]
+        # * Initialize a queue with all the arcs, unless given some
+        if arcs is None:
+            arcs = [
+                (variable, neighbor)
+                for variable in self.domains
+                for neighbor in self.crossword.neighbors(variable)
+            ]
+        queue = collections.deque(arcs)
+        queued = set(queue)
+
+        # * Calls revise on each arc in the queue
+        while queue:
+            arc = queue.popleft()
+            queued.discard(arc)
+            x, y = arc
             if self.revise(x, y):
                 # * If x is revised and x is empty after revision, return false
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
+                    self.failures[frozenset(arc)] += 1
                     return False
                 # * Adds neighbors of x back to the queue to check whether they are still are consistent after x is revised
                 for neighbor in self.crossword.neighbors(x):
-                    if neighbor != y:
-                        arcs.append((neighbor, x))
+                    if neighbor != y and (neighbor, x) not in queued:
+                        queue.append((neighbor, x))
+                        queued.add((neighbor, x))
 
         return True
 
@@ -216,6 +305,10 @@ class CrosswordCreator:
         Return True if `assignment` is consistent (i.e., words fit in crossword
         puzzle without conflicting characters); return False otherwise.
         """
+        # * Checks if all values are distinct
+        if len(set(assignment.values())) != len(assignment):
+            return False
+
         for variable in self.domains:
             # * Only considers assigned variables
             if variable not in assignment:
@@ -225,19 +318,12 @@ class CrosswordCreator:
             if len(assignment[variable]) != variable.length:
                 return False
 
-            # * Gets neighbors for current variable
-            arcs = self.crossword.neighbors(variable)
-
-            # * Loops through each neighbor
-            for neighbor in arcs:
+            # * Loops through each neighbor and its overlap with variable
+            for neighbor, (i, j) in self.crossword.adjacency[variable].items():
                 if neighbor not in assignment:
                     continue
-                # * Checks if all values are distinct
-                if assignment[variable] == assignment[neighbor]:
-                    return False
 
                 # * Checks whether there is a conflict
-                i, j = self.crossword.overlaps[(variable, neighbor)]
                 if assignment[variable][i] != assignment[neighbor][j]:
                     return False
 
@@ -250,11 +336,35 @@ class CrosswordCreator:
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        values = list()
-        for word in assignment[var]:
-            values.append(word)
-
-        return values
+        values = self.values(self.domains[var])
+        if self.random and self.value_order != "domain":
+            self.random.shuffle(values)
+        if self.value_order != "lcv":
+            return values
+
+        # * Counts the words of each unassigned neighbor with each letter
+        # * at the overlap, from the letter-position index
+        neighbors = []
+        for neighbor, (i, j) in self.crossword.adjacency[var].items():
+            if neighbor in assignment:
+                continue
+            domain = self.domains[neighbor]
+            counts = {
+                letter: (domain & words).bit_count()
+                for letter, words in self.index.letter_bits(
+                    neighbor.length, j
+                ).items()
+            }
+            neighbors.append((i, domain.bit_count(), counts))
+
+        # * A value rules out the neighbors' words without its letter there
+        def ruled_out(word):
+            return sum(
+                size - counts.get(word[i], 0) for i, size, counts in neighbors
+            )
+
+        # * Sorting is stable, so shuffled values break ties at random
+        return sorted(values, key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -263,40 +373,75 @@ class CrosswordCreator:
         in its domain. If there is a tie, choose the variable with the highest
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
+
+        With "domwdeg" variable ordering, instead choose the variable with
+        the minimum number of remaining values divided by the sum of the
+        weights of its constraints with unassigned variables, where each
+        constraint weighs one more than the number of times it has wiped
+        out a domain.
         """
-        variables = list()
+        best, best_key = None, None
         for var in self.domains:
             if var in assignment:
                 continue
-            num_neighbors = len(self.crossword.neighbors(var))
-            variables.append((len(self.domains[var]), num_neighbors, var))
-
-        sorted_variables = sorted(variables, key=lambda var: var[0])
-        if len(sorted_variables) > 1:
-            if sorted_variables[0][0] == sorted_variables[1][0]:
-                sorted_variables = sorted(variables, key=lambda var:var[1], reverse=True)
-            
-        variable = sorted_variables[0][2]
-        if variable not in assignment:
-            return variable
-
-    def inference(self, var):
-        """
-        Returns a dictionary of {var: value} by calling ac3 when doing 
-        backtrack search.
-        """
-        inferences = dict()
-        
-        neighbours = self.crossword.neighbors(var)
-        arcs = []
-        for neighbour in neighbours:
-            arcs.append((neighbour, var))
-        if self.ac3(arcs=arcs):
-            for v in self.domains:
-                if len(self.domains[v]) == 1:
-                    inferences[v] = self.domains[v].pop()
-
-        return inferences
+            size = self.domains[var].bit_count()
+            neighbors = [
+                neighbor for neighbor in self.crossword.neighbors(var)
+                if neighbor not in assignment
+            ]
+            if self.variable_order == "domwdeg":
+                weight = sum(
+                    1 + self.failures[frozenset((var, neighbor))]
+                    for neighbor in neighbors
+                )
+                key = (size / weight if weight else size, -len(neighbors))
+            else:
+                key = (size, -len(neighbors))
+            if self.random:
+                key += (self.random.random(),)
+            if best_key is None or key < best_key:
+                best, best_key = var, key
+        return best
+
+    def inference(self, var, assignment):
+        """
+        Maintain arc consistency after assigning `var`: restrict its domain
+        to the assigned word, remove that word from every other unassigned
+        variable, and then enforce arc consistency on the arcs into the
+        changed domains. Domain changes are recorded on the trail.
+
+        Returns a dictionary of {var: value} for the unassigned variables
+        left with a single value, or None if a domain was wiped out.
+        """
+        word = assignment[var]
+        bit = 1 << self.index.number(word)
+        self.set_domain(var, bit)
+        changed = [var]
+
+        # * All words are distinct, so no other variable can take this one
+        for v in self.domains:
+            if v not in assignment and self.domains[v] & bit:
+                self.set_domain(v, self.domains[v] & ~bit)
+                if self.stats is not None:
+                    self.stats["values_pruned"] += 1
+                if not self.domains[v]:
+                    return None
+                changed.append(v)
+
+        arcs = [
+            (neighbor, v)
+            for v in changed
+            for neighbor in self.crossword.neighbors(v)
+            if neighbor not in assignment
+        ]
+        if not self.ac3(arcs):
+            return None
+
+        return {
+            v: self.words[self.domains[v].bit_length() - 1]
+            for v in self.domains
+            if v not in assignment and self.domains[v].bit_count() == 1
+        }
 
     def backtrack(self, assignment):
         """
@@ -307,63 +452,212 @@ class CrosswordCreator:
 
         If no assignment is possible, return None.
         """
-        # * Checks if the assignment is already complete and return the assignment if it is
+        return next(self.search(assignment), None)
+
+    def search(self, assignment):
+        """
+        Using Backtracking Search, extend the partial assignment
+        `assignment` to each complete assignment in turn, yielding
+        `assignment` itself whenever it is complete.
+        """
+        if self.stats is not None:
+            self.stats["nodes"] += 1
+
+        # * Checks if the assignment is already complete and yields the assignment if it is
         if self.assignment_complete(assignment):
-            return assignment
+            yield assignment
+            return
+
+        # * Stops searching once out of time
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError("crossword search ran out of time")
 
-        # * Gets a random unassigned variable
+        # * Gets the next unassigned variable
         var = self.select_unassigned_variable(assignment)
 
-        domain_copy = copy.deepcopy(self.domains)
+        # * Marks the trail, to undo the domain changes of each value tried
+        mark = len(self.trail)
 
         # * Loops through all values var can take
-        for word in domain_copy[var]:
+        for word in self.order_domain_values(var, assignment):
             assignment[var] = word
-            self.domains[var] = {word}
-            inferences = self.inference(var)
-            if len(inferences) > 0:
+            inferences = self.inference(var, assignment)
+            if inferences is not None:
+                assignment.update(inferences)
+                # * Checks if current assignment is still consistent
+                if self.consistent(assignment):
+                    # * Yields each way of completing the assignment by recursively searching
+                    yield from self.search(assignment)
                 for variable in inferences:
-                    assignment[variable] = inferences[variable]
-            # * Checks if current assignment is still consistent
-            if self.consistent(assignment):
-                # * Checks whether the assignment fails at any point in the future by recursively calling backtrack
-                result = self.backtrack(assignment)
-                # * If nothing fails then return the result
-                if result != None:
-                    return result
-            # * If {var = word} fails, removes it from assignment
-            del assignment[var]
-            for variable in inferences:
-                if variable in assignment:
                     del assignment[variable]
-
-        # * If no assignment works, return None
-        return None
+            # * Once {var = word} is exhausted, removes it from assignment
+            del assignment[var]
+            self.undo(mark)
+
+            # * Gives up on this run of a restarting search after too many
+            # * backtracks
+            self.backtracks += 1
+            if self.stats is not None:
+                self.stats["backtracks"] += 1
+            if self.limit is not None and self.backtracks > self.limit:
+                raise Restart
+
+
+# Crossword loaded once in each worker process of a portfolio
+portfolio_crossword = None
+
+
+def portfolio_configs(count, seed=None):
+    """
+    Return `count` solver configurations for a portfolio: the default
+    deterministic one, followed by randomised ones that cycle through
+    the heuristics, each with its own seed and a restart schedule.
+    """
+    rng = random.Random(seed)
+    heuristics = itertools.cycle(itertools.product(
+        CrosswordCreator.VARIABLE_ORDERS, CrosswordCreator.VALUE_ORDERS
+    ))
+    configs = [dict(variable_order="domwdeg", value_order="lcv")]
+    for variable_order, value_order in itertools.islice(heuristics, count - 1):
+        configs.append(dict(
+            variable_order=variable_order,
+            value_order=value_order,
+            seed=rng.getrandbits(32),
+            restart_base=RESTART_BASE,
+        ))
+    return configs[:count]
+
+
+def initialize_portfolio(structure, words):
+    """Load the crossword once in each worker process."""
+    global portfolio_crossword
+    portfolio_crossword = Crossword(structure, words)
+
+
+def solve_config(config):
+    """Return `(config, assignment)` for a solver configuration."""
+    return config, CrosswordCreator(portfolio_crossword, **config).solve()
+
+
+def portfolio_solve(structure, words, configs, processes=None):
+    """
+    Solve the crossword with each of `configs` in a pool of `processes`
+    processes, and return the first assignment found with the
+    configuration that found it, cancelling the other solvers. Return
+    `(None, None)` if there is no solution.
+    """
+    with multiprocessing.Pool(
+        processes or min(len(configs), os.cpu_count()),
+        initializer=initialize_portfolio, initargs=(structure, words)
+    ) as pool:
+        for config, assignment in pool.imap_unordered(solve_config, configs):
+            if assignment is not None:
+                # Leaving the pool terminates the other solvers
+                return assignment, config
+    return None, None
 
 
 def main():
 
-    # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
-
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
-
-    # Generate crossword
-    crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
-
-    # Print result
-    if assignment is None:
+    parser = argparse.ArgumentParser(
+        usage="python generate.py structure words [output] [options]"
+    )
+    parser.add_argument("structure")
+    parser.add_argument("words", help="word list or word index")
+    parser.add_argument(
+        "output", nargs="?",
+        help="image file to save, numbered if there are several solutions"
+    )
+    parser.add_argument(
+        "--structure", action="append", default=[], dest="structures",
+        help="another structure to fill with the same words (repeatable)"
+    )
+    parser.add_argument("--count", type=int, default=1,
+                        help="distinct solutions to find per structure")
+    parser.add_argument("--time-limit", type=float, metavar="SECONDS",
+                        help="stop searching after this long")
+    parser.add_argument(
+        "--portfolio", type=int, metavar="N",
+        help="race N solver configurations in parallel"
+    )
+    parser.add_argument(
+        "--processes", type=int,
+        help="processes for the portfolio, or for saving many images"
+    )
+    parser.add_argument("--seed", type=int,
+                        help="seed for the portfolio's configurations")
+    args = parser.parse_args()
+    structures = [args.structure] + args.structures
+    batch = len(structures) > 1 or args.count > 1
+    if args.portfolio and batch:
+        parser.error("--portfolio finds a single solution to one structure")
+
+    if args.portfolio:
+        crossword = Crossword(args.structure, args.words)
+        creator = CrosswordCreator(crossword)
+        assignment, config = portfolio_solve(
+            args.structure, args.words,
+            portfolio_configs(args.portfolio, args.seed), args.processes
+        )
+        if assignment is None:
+            print("No solution.")
+        else:
+            creator.print(assignment)
+            print(f"Solved by {config}")
+            if args.output:
+                creator.save(assignment, args.output)
+        return
+
+    # Load the words once, for every structure
+    index = WordIndex.open(args.words)
+    deadline = None
+    if args.time_limit is not None:
+        deadline = time.monotonic() + args.time_limit
+
+    # Save the images of many solutions in parallel, as they are found
+    pool = None
+    saving = []
+    if args.output and batch:
+        pool = multiprocessing.Pool(args.processes)
+
+    # Generate crosswords, printing each solution as it is found
+    found = 0
+    try:
+        for structure in structures:
+            crossword = Crossword(structure, args.words, index)
+            creator = CrosswordCreator(crossword)
+            creator.deadline = deadline
+            solutions = itertools.islice(creator.solutions(), args.count)
+            filled = found
+            for assignment in solutions:
+                found += 1
+                if batch:
+                    print(f"Solution {found} ({structure}):")
+                creator.print(assignment)
+                if pool:
+                    root, extension = os.path.splitext(args.output)
+                    saving.append(pool.apply_async(render.save, (
+                        crossword.structure,
+                        creator.letter_grid(assignment),
+                        f"{root}{found}{extension}",
+                    )))
+                elif args.output:
+                    creator.save(assignment, args.output)
+                sys.stdout.flush()
+            if batch and found == filled:
+                print(f"No solution ({structure}).")
+    except TimeoutError:
+        print("Time limit reached.")
+    finally:
+        if pool:
+            pool.close()
+            for result in saving:
+                result.get()
+            pool.join()
+
+    if not batch and not found:
         print("No solution.")
-    else:
-        creator.print(assignment)
-        if output:
-            creator.save(assignment, output)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+"""
+Render crossword grids to image files.
+
+A `Renderer` loads its font once and draws each letter once, onto a tile
+the size of a cell's interior, so a grid is drawn by pasting tiles onto
+a black canvas. `save` keeps one renderer per process, so that worker
+processes saving many grids each load the font once.
+"""
+
+import os
+
+FONT = os.path.join(os.path.dirname(__file__), "assets", "fonts",
+                    "OpenSans-Regular.ttf")
+FONT_SIZE = 80
+
+CELL_SIZE = 100
+CELL_BORDER = 2
+
+# Renderer used by `save` in this process, created on first use
+renderer = None
+
+
+class Renderer():
+    """Draws crossword grids, caching the font and a tile per letter."""
+
+    def __init__(self, cell_size=CELL_SIZE, cell_border=CELL_BORDER,
+                 font=FONT, font_size=FONT_SIZE):
+        from PIL import ImageFont
+
+        self.cell_size = cell_size
+        self.cell_border = cell_border
+        self.font = ImageFont.truetype(font, font_size)
+
+        # Tiles cover a cell's interior, including its far edges
+        self.tile_size = cell_size - 2 * cell_border + 1
+        self.tiles = dict()
+
+    def tile(self, letter):
+        """
+        Return the tile of a white cell showing `letter`, or of an empty
+        white cell if `letter` is None.
+        """
+        tile = self.tiles.get(letter)
+        if tile is None:
+            from PIL import Image, ImageDraw
+
+            tile = Image.new("RGBA", (self.tile_size, self.tile_size), "white")
+            if letter:
+                draw = ImageDraw.Draw(tile)
+                draw.text(
+                    (self.tile_size / 2, self.tile_size / 2),
+                    letter,
+                    fill="black",
+                    font=self.font,
+                    anchor="mm",
+                )
+            self.tiles[letter] = tile
+        return tile
+
+    def render(self, structure, letters):
+        """
+        Return an image of a grid, where `structure[i][j]` is True for the
+        cells that hold letters and `letters[i][j]` is the letter in each
+        (or None if it is empty).
+        """
+        from PIL import Image
+
+        height, width = len(structure), len(structure[0])
+        img = Image.new(
+            "RGBA", (width * self.cell_size, height * self.cell_size), "black"
+        )
+        for i in range(height):
+            for j in range(width):
+                if structure[i][j]:
+                    img.paste(self.tile(letters[i][j]), (
+                        j * self.cell_size + self.cell_border,
+                        i * self.cell_size + self.cell_border,
+                    ))
+        return img
+
+
+def save(structure, letters, filename):
+    """Save an image of a grid, as for `Renderer.render`, to `filename`."""
+    global renderer
+    if renderer is None:
+        renderer = Renderer()
+    renderer.render(structure, letters).save(filename)
+
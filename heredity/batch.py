@@ -0,0 +1,153 @@
+"""
+Run exact heredity inference over many family files in a process pool.
+
+Usage: python batch.py (directory | -) output.(jsonl|csv) [method] [processes]
+
+With a directory, every CSV file in it is processed; with `-`, family
+file names are read one per line from standard input. Marginals are
+written as JSON lines (one object per family) or as CSV rows (one per
+person), and throughput is reported on standard error.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import heredity
+
+# Methods that accept the tables returned by `heredity.factor_tables`
+METHODS = {
+    "elimination": heredity.variable_elimination,
+    "pruned": heredity.pruned_enumeration,
+}
+
+# Number of families sent to a worker at once
+CHUNK_SIZE = 16
+
+# Factor tables derived from `heredity.PROBS`, computed once per worker
+tables = None
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        usage="python batch.py (directory | -) output.(jsonl|csv) "
+              f"[{'|'.join(METHODS)}] [processes]"
+    )
+    parser.add_argument("source", help="directory of family files, or -")
+    parser.add_argument("output", help="file to write, .jsonl or .csv")
+    parser.add_argument("method", nargs="?", default="elimination",
+                        choices=METHODS)
+    parser.add_argument("processes", nargs="?", type=int,
+                        default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+    source, output, method = args.source, args.output, args.method
+
+    # Check arguments before starting the pool
+    if source != "-" and not os.path.isdir(source):
+        parser.error(f"{source} is not a directory")
+    if args.processes < 1:
+        parser.error("processes must be positive")
+    if output.endswith(".csv"):
+        writer = csv_writer
+    elif output.endswith(".jsonl"):
+        writer = jsonl_writer
+    else:
+        parser.error("output must be a .jsonl or .csv file")
+
+    start = time.perf_counter()
+    families = people = failures = 0
+    with open(output, "w", newline="") as f, multiprocessing.Pool(
+        args.processes, initializer=initialize
+    ) as pool:
+        write = writer(f)
+        jobs = ((filename, method) for filename in family_files(source))
+        for filename, result in pool.imap(infer, jobs, CHUNK_SIZE):
+            families += 1
+            if isinstance(result, str):
+                failures += 1
+                print(f"{filename}: {result}", file=sys.stderr)
+                continue
+            people += len(result)
+            write(filename, result)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{families} families ({people} people, {failures} failed) in "
+        f"{elapsed:.2f}s: {families / elapsed:.1f} families/s, "
+        f"{people / elapsed:.1f} people/s",
+        file=sys.stderr,
+    )
+
+
+def family_files(source):
+    """
+    Yield family file names: every CSV file in directory `source`, or
+    each non-empty line of standard input if `source` is `-`.
+    """
+    if source == "-":
+        for line in sys.stdin:
+            if line.strip():
+                yield line.strip()
+    else:
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith(".csv"):
+                yield os.path.join(source, filename)
+
+
+def initialize():
+    """Compute the factor tables once in each worker process."""
+    global tables
+    tables = heredity.factor_tables()
+
+
+def infer(job):
+    """
+    Return `(filename, probabilities)` for a `(filename, method)` job,
+    or `(filename, message)` if the family could not be processed.
+    """
+    filename, method = job
+    try:
+        pedigree = heredity.load_pedigree(filename)
+        return filename, METHODS[method](pedigree, tables)
+    except Exception as e:
+        return filename, f"{type(e).__name__}: {e}"
+
+
+def jsonl_writer(f):
+    """
+    Return a function writing each family's marginals to `f` as a
+    JSON object on its own line.
+    """
+    def write(filename, probabilities):
+        f.write(json.dumps({"file": filename, "people": probabilities}))
+        f.write("\n")
+    return write
+
+
+def csv_writer(f):
+    """
+    Return a function writing each person's marginals to `f` as a CSV
+    row, after a header row.
+    """
+    writer = csv.writer(f)
+    writer.writerow(["file", "name", "gene_0", "gene_1", "gene_2", "trait"])
+
+    def write(filename, probabilities):
+        for name, distributions in probabilities.items():
+            writer.writerow([
+                filename,
+                name,
+                *(distributions["gene"][genes] for genes in range(3)),
+                distributions["trait"][True],
+            ])
+    return write
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
+import argparse
 import csv
+import heapq
 import itertools
+import math
+import multiprocessing
+import os
+import random
 import sys
+import time
 
 PROBS = {
     # Unconditional probabilities for having gene
@@ -17,13 +24,78 @@ PROBS = {
     "mutation": 0.01,
 }
 
+# Number of assignments evaluated at once when vectorizing
+BATCH_SIZE = 65536
+
+# Default sample budget, seed, worker processes and time limit in seconds
+# for the approximate sampling methods
+SAMPLES = 10000
+SEED = None
+PROCESSES = os.cpu_count()
+TIME_LIMIT = None
+
+# Number of batches per worker used to estimate standard errors, and the
+# fraction of Gibbs sampling sweeps discarded as burn-in
+BATCHES = 10
+BURN_IN = 0.1
+
 
 def main():
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    # Parse command-line arguments
+    methods = list(METHODS) + list(SAMPLERS)
+    parser = argparse.ArgumentParser(
+        usage=f"python heredity.py data.csv [{'|'.join(methods)}] [options]"
+    )
+    parser.add_argument("data")
+    parser.add_argument("method", nargs="?", default="enumerate", choices=methods)
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="samples to draw with the sampling methods")
+    parser.add_argument("--seed", type=int, default=SEED,
+                        help="seed for the sampling methods")
+    parser.add_argument("--processes", type=int, default=PROCESSES,
+                        help="worker processes for the sampling methods")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT,
+                        metavar="SECONDS",
+                        help="stop sampling after this long")
+    args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be positive")
+    try:
+        pedigree = load_pedigree(args.data)
+    except ValueError as e:
+        sys.exit(str(e))
+    method = args.method
+
+    # Compute gene and trait probabilities for each person
+    if method in SAMPLERS:
+        probabilities, errors = sample_probabilities(
+            pedigree, SAMPLERS[method], args.samples, args.seed,
+            args.processes, args.time_limit
+        )
+    else:
+        probabilities, errors = METHODS[method](pedigree), None
+
+    # Print results
+    for person in probabilities:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors:
+                    e = errors[person][field][value]
+                    print(f"    {value}: {p:.4f} ± {e:.4f}")
+                else:
+                    print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(pedigree):
+    """
+    Compute gene and trait probabilities for everyone in `pedigree` by
+    summing the joint probability of every possible assignment.
+    """
+    people = pedigree.people()
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -56,15 +128,7 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -94,6 +158,155 @@ def load_data(filename):
     return data
 
 
+class Pedigree():
+    """
+    A family whose members are indexed by integers in topological order,
+    so that parents always come before their children.
+
+    For each person `i`, `names[i]` is their name; `mothers[i]` and
+    `fathers[i]` are the indices of their parents, or -1 if unknown;
+    `observed[i]` is whether their trait is known, and `traits[i]` its
+    value if so (False otherwise); and `children[i]` lists
+    `(child, other parent)` pairs. `listed` holds the indices of people
+    in the order they appeared in the file.
+    """
+
+    def __init__(self, names, mothers, fathers, observed, traits, listed):
+        self.names = names
+        self.mothers = mothers
+        self.fathers = fathers
+        self.observed = observed
+        self.traits = traits
+        self.listed = listed
+        self.children = [[] for _ in names]
+        for child, (mother, father) in enumerate(zip(mothers, fathers)):
+            if mother >= 0:
+                self.children[mother].append((child, father))
+                self.children[father].append((child, mother))
+
+    def __len__(self):
+        return len(self.names)
+
+    def trait(self, i):
+        """Return person `i`'s observed trait, or None if unobserved."""
+        return self.traits[i] if self.observed[i] else None
+
+    def people(self):
+        """Return the family as a dictionary, in the format of `load_data`."""
+        return {
+            self.names[i]: {
+                "name": self.names[i],
+                "mother": self.names[self.mothers[i]] if self.mothers[i] >= 0 else None,
+                "father": self.names[self.fathers[i]] if self.fathers[i] >= 0 else None,
+                "trait": self.trait(i),
+            }
+            for i in self.listed
+        }
+
+    def results(self, genes, traits, normalize=True):
+        """
+        Return a dictionary mapping each person's name to their gene and
+        trait distributions, in the format printed by `main`, given each
+        person's distribution over 0, 1 and 2 genes in `genes[i]` and
+        over not having and having the trait in `traits[i]`. Unless
+        `normalize` is False, each distribution is scaled to sum to 1.
+        """
+        results = dict()
+        for i in self.listed:
+            gene_alpha = 1 / sum(genes[i]) if normalize else 1
+            trait_alpha = 1 / sum(traits[i]) if normalize else 1
+            results[self.names[i]] = {
+                "gene": {g: genes[i][g] * gene_alpha for g in (2, 1, 0)},
+                "trait": {t: traits[i][t] * trait_alpha for t in (True, False)},
+            }
+        return results
+
+
+def load_pedigree(filename):
+    """
+    Load a family from a CSV file in the format read by `load_data`,
+    one row at a time, into a `Pedigree`.
+
+    Raise ValueError if the file is malformed, a name appears twice, a
+    person has only one parent or a parent missing from the file, or
+    anyone is their own ancestor.
+    """
+    index = dict()
+    parents = []
+    traits = []
+    with open(filename, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        fields = ["name", "mother", "father", "trait"]
+        if not set(fields) <= set(header):
+            raise ValueError(f"{filename}: expected columns {', '.join(fields)}")
+        columns = [header.index(field) for field in fields]
+
+        for row in reader:
+            if not row:
+                continue
+            where = f"{filename}:{reader.line_num}"
+            if len(row) < len(header):
+                raise ValueError(f"{where}: expected {len(header)} fields")
+            name, mother, father, trait = (row[column] for column in columns)
+            if not name:
+                raise ValueError(f"{where}: missing name")
+            if name in index:
+                raise ValueError(f"{where}: {name} appears more than once")
+            if bool(mother) != bool(father):
+                raise ValueError(f"{where}: {name} must have both parents or neither")
+            if trait not in ("", "0", "1"):
+                raise ValueError(f"{where}: trait must be 0, 1 or blank")
+            index[name] = len(parents)
+            parents.append((mother, father))
+            traits.append(trait)
+
+    # Resolve parents to indices
+    names = list(index)
+    for i, (mother, father) in enumerate(parents):
+        if not mother:
+            parents[i] = (-1, -1)
+            continue
+        for parent in (mother, father):
+            if parent not in index:
+                raise ValueError(
+                    f"{filename}: {names[i]}'s parent {parent} is not in the file"
+                )
+        if mother == father:
+            raise ValueError(f"{filename}: {names[i]}'s parents are the same person")
+        parents[i] = (index[mother], index[father])
+
+    # Order people so that parents come before children, and detect cycles
+    children = [[] for _ in names]
+    waiting = [0] * len(names)
+    for i, (mother, father) in enumerate(parents):
+        if mother >= 0:
+            children[mother].append(i)
+            children[father].append(i)
+            waiting[i] = 2
+    order = [i for i in range(len(names)) if not waiting[i]]
+    for i in order:
+        for child in children[i]:
+            waiting[child] -= 1
+            if not waiting[child]:
+                order.append(child)
+    if len(order) < len(names):
+        cycle = next(names[i] for i in range(len(names)) if waiting[i])
+        raise ValueError(f"{filename}: {cycle} is their own ancestor")
+
+    position = [0] * len(names)
+    for new, old in enumerate(order):
+        position[old] = new
+    return Pedigree(
+        names=[names[i] for i in order],
+        mothers=[position[parents[i][0]] if parents[i][0] >= 0 else -1 for i in order],
+        fathers=[position[parents[i][1]] if parents[i][1] >= 0 else -1 for i in order],
+        observed=[traits[i] != "" for i in order],
+        traits=[traits[i] == "1" for i in order],
+        listed=position,
+    )
+
+
 def powerset(s):
     """
     Return a list of all possible subsets of set s.
@@ -240,5 +453,686 @@ def normalize(probabilities):
             probabilities[person]["trait"][trait] *= alpha
 
 
+def inheritance_probability(genes):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes a copy on to their child.
+    """
+    if genes == 2:
+        return 1 - PROBS["mutation"]
+    if genes == 1:
+        return 0.5
+    return PROBS["mutation"]
+
+
+def gene_probability(genes, mother_genes, father_genes):
+    """
+    Return the probability that a child has `genes` copies of the gene,
+    given the number of copies each of their parents has.
+    """
+    mother = inheritance_probability(mother_genes)
+    father = inheritance_probability(father_genes)
+    if genes == 2:
+        return mother * father
+    if genes == 1:
+        return mother * (1 - father) + father * (1 - mother)
+    return (1 - mother) * (1 - father)
+
+
+def trait_evidence(trait, genes):
+    """
+    Return the probability of observing `trait` given `genes` copies of
+    the gene, or 1 if the trait was not observed.
+    """
+    if trait is None:
+        return 1
+    return PROBS["trait"][genes][trait]
+
+
+def factor_tables():
+    """
+    Return `(founder, child)` dictionaries mapping each possible observed
+    trait (True, False or None) to the table of a person's factor: over
+    their own genes for people without parents, and over their own and
+    their mother's and father's genes for everyone else.
+
+    The tables depend only on `PROBS`, so they can be computed once and
+    shared between people and between families.
+    """
+    founder = dict()
+    child = dict()
+    for trait in (True, False, None):
+        founder[trait] = {
+            (genes,): PROBS["gene"][genes] * trait_evidence(trait, genes)
+            for genes in range(3)
+        }
+        child[trait] = {
+            (genes, mother_genes, father_genes): (
+                gene_probability(genes, mother_genes, father_genes)
+                * trait_evidence(trait, genes)
+            )
+            for genes, mother_genes, father_genes in itertools.product(
+                range(3), repeat=3
+            )
+        }
+    return founder, child
+
+
+def person_factor(pedigree, i, tables=None):
+    """
+    Return the factor of person `i` in the Bayesian network of
+    `pedigree`: the probability of their number of genes given their
+    parents' number of genes, times the probability of their observed
+    trait. `tables` are the factor tables returned by `factor_tables`.
+
+    Factors are `(variables, table)` pairs, where `table` maps each
+    tuple of gene counts for `variables` (people's indices) to a value.
+    """
+    founder, child = tables or factor_tables()
+    trait = pedigree.trait(i)
+    if pedigree.mothers[i] < 0:
+        return (i,), founder[trait]
+    return (i, pedigree.mothers[i], pedigree.fathers[i]), child[trait]
+
+
+def factor_product(*factors):
+    """
+    Return the product of `factors`, over the union of their variables.
+    """
+    variables = tuple(dict.fromkeys(
+        variable for factor_variables, _ in factors
+        for variable in factor_variables
+    ))
+    positions = [
+        [variables.index(variable) for variable in factor_variables]
+        for factor_variables, _ in factors
+    ]
+    table = dict()
+    for assignment in itertools.product(range(3), repeat=len(variables)):
+        p = 1
+        for (_, factor_table), indices in zip(factors, positions):
+            p *= factor_table[tuple(assignment[i] for i in indices)]
+        table[assignment] = p
+    return variables, table
+
+
+def factor_marginal(factor, keep):
+    """
+    Return `factor` with every variable not in `keep` summed out.
+    """
+    variables, table = factor
+    kept = tuple(variable for variable in variables if variable in keep)
+    indices = [variables.index(variable) for variable in kept]
+    marginal = dict.fromkeys(itertools.product(range(3), repeat=len(kept)), 0)
+    for assignment, p in table.items():
+        marginal[tuple(assignment[i] for i in indices)] += p
+    return kept, marginal
+
+
+def factor_normalize(factor):
+    """
+    Return `factor` scaled so that its entries sum to 1, or unchanged if
+    they sum to 0.
+    """
+    variables, table = factor
+    total = sum(table.values())
+    if not total:
+        return factor
+    return variables, {assignment: p / total for assignment, p in table.items()}
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate the variables of `factors`,
+    greedily choosing the variable with the fewest neighbours in the
+    interaction graph and connecting its neighbours as it is removed.
+    """
+    neighbors = dict()
+    for variables, _ in factors:
+        for variable in variables:
+            neighbors.setdefault(variable, set()).update(variables)
+    for variable in neighbors:
+        neighbors[variable].discard(variable)
+
+    order = []
+    heap = [(len(neighbors[v]), i, v) for i, v in enumerate(neighbors)]
+    heapq.heapify(heap)
+    position = {v: i for i, v in enumerate(neighbors)}
+    eliminated = set()
+    while heap:
+        degree, _, variable = heapq.heappop(heap)
+        if variable in eliminated or degree != len(neighbors[variable]):
+            continue
+        order.append(variable)
+        eliminated.add(variable)
+        adjacent = neighbors.pop(variable)
+        for neighbor in adjacent:
+            neighbors[neighbor].discard(variable)
+            neighbors[neighbor].update(adjacent - {neighbor})
+            heapq.heappush(
+                heap, (len(neighbors[neighbor]), position[neighbor], neighbor)
+            )
+    return order
+
+
+def variable_elimination(pedigree, tables=None):
+    """
+    Compute exact gene and trait probabilities for everyone in `pedigree`
+    by treating the family as a Bayesian network over gene counts.
+
+    Eliminating variables one at a time builds a clique tree, whose
+    upward messages are the intermediate factors of variable elimination;
+    a downward pass then calibrates every clique, so that all marginals
+    come out of a single elimination. For tree-shaped families every
+    clique covers at most a person and their parents, and the cost is
+    linear in the number of people. Messages are rescaled to sum to 1,
+    since only their proportions matter and products over large families
+    would otherwise underflow. `tables` are the factor tables returned
+    by `factor_tables`, computed if not given.
+    """
+    tables = tables or factor_tables()
+    factors = [person_factor(pedigree, i, tables) for i in range(len(pedigree))]
+
+    # Factors not yet consumed by a clique, each with the clique that
+    # produced it (or None for the people's own factors), indexed by the
+    # variables they contain
+    pool = dict()
+    containing = dict()
+    keys = itertools.count()
+
+    def add_to_pool(factor, origin):
+        key = next(keys)
+        pool[key] = (factor, origin)
+        for variable in factor[0]:
+            containing.setdefault(variable, set()).add(key)
+
+    for factor in factors:
+        add_to_pool(factor, None)
+
+    # For each clique: its own potential, variable, children and the
+    # messages sent up by them
+    potentials = []
+    eliminated = []
+    children = []
+    upward = []
+    for variable in elimination_order(factors):
+        involved = []
+        for key in sorted(containing.pop(variable)):
+            entry = pool.pop(key)
+            involved.append(entry)
+            for other in entry[0][0]:
+                if other != variable:
+                    containing[other].discard(key)
+        clique = len(potentials)
+
+        own = [factor for factor, origin in involved if origin is None]
+        messages = [factor for factor, origin in involved if origin is not None]
+        potentials.append(factor_product(*own))
+        eliminated.append(variable)
+        children.append([origin for _, origin in involved if origin is not None])
+
+        # Sum the variable out of everything it appears in
+        scope = set().union(*(factor[0] for factor, _ in involved))
+        message = factor_normalize(factor_marginal(
+            factor_product(potentials[clique], *messages), scope - {variable}
+        ))
+        upward.append(message)
+        add_to_pool(message, clique)
+
+    # Send messages down from each clique to its children, parents first
+    downward = [None] * len(potentials)
+    genes = [None] * len(pedigree)
+    traits = [None] * len(pedigree)
+    for clique in reversed(range(len(potentials))):
+        incoming = [upward[child] for child in children[clique]]
+        if downward[clique] is not None:
+            incoming.append(downward[clique])
+        belief = factor_product(potentials[clique], *incoming)
+
+        for k, child in enumerate(children[clique]):
+            others = incoming[:k] + incoming[k + 1:]
+            downward[child] = factor_normalize(factor_marginal(
+                factor_product(potentials[clique], *others),
+                set(upward[child][0]),
+            ))
+
+        i = eliminated[clique]
+        _, marginal = factor_marginal(belief, {i})
+        genes[i] = [marginal[(g,)] for g in range(3)]
+        if pedigree.observed[i]:
+            traits[i] = [not pedigree.traits[i], pedigree.traits[i]]
+        else:
+            traits[i] = [
+                sum(genes[i][g] * PROBS["trait"][g][t] for g in range(3))
+                for t in (False, True)
+            ]
+
+    return pedigree.results(genes, traits)
+
+
+def gene_assignments(pedigree, tables=None):
+    """
+    Lazily yield `(genes, p)` for every assignment of gene counts to the
+    people in `pedigree` with non-zero probability, where `genes[i]` is
+    person `i`'s number of genes and `p` is the joint probability of
+    those genes and of every observed trait. Unobserved traits are
+    summed out.
+
+    People are assigned in topological order, so each person's factor
+    can be looked up as soon as they are assigned, and partial products
+    are shared between all assignments with the same prefix. The `genes`
+    list is reused between assignments.
+    """
+    tables = tables or factor_tables()
+    n = len(pedigree)
+    factors = [person_factor(pedigree, i, tables) for i in range(n)]
+    genes = [0] * n
+
+    def assign(i, p):
+        if i == n:
+            yield genes, p
+            return
+        variables, table = factors[i]
+        for value in range(3):
+            genes[i] = value
+            q = p * table[tuple(genes[variable] for variable in variables)]
+            if q:
+                yield from assign(i + 1, q)
+
+    yield from assign(0, 1)
+
+
+def pruned_enumeration(pedigree, tables=None):
+    """
+    Compute gene and trait probabilities for everyone in `pedigree` by
+    enumerating only gene assignments, consistent with the evidence by
+    construction. Each person's unobserved trait is summed out
+    analytically, from the probability of the trait given their genes.
+    `tables` are the factor tables returned by `factor_tables`.
+    """
+    n = len(pedigree)
+    observed = pedigree.observed
+    have_trait = pedigree.traits
+    trait_table = [[PROBS["trait"][g][False], PROBS["trait"][g][True]] for g in range(3)]
+    genes = [[0, 0, 0] for _ in range(n)]
+    traits = [[0, 0] for _ in range(n)]
+
+    for assignment, p in gene_assignments(pedigree, tables):
+        for i, value in enumerate(assignment):
+            genes[i][value] += p
+            if observed[i]:
+                traits[i][have_trait[i]] += p
+            else:
+                traits[i][False] += p * trait_table[value][False]
+                traits[i][True] += p * trait_table[value][True]
+
+    return pedigree.results(genes, traits)
+
+
+def probability_tables():
+    """
+    Return the probabilities in `PROBS` as NumPy arrays:
+        * `gene[g]`, the unconditional probability of `g` genes,
+        * `inheritance[m, f, g]`, the probability of `g` genes given a
+          mother with `m` genes and a father with `f` genes, and
+        * `trait[g, t]`, the probability of trait value `t` (0 or 1)
+          given `g` genes, with `trait[g, -1] == 1` for unobserved traits.
+    """
+    import numpy as np
+
+    gene = np.array([PROBS["gene"][g] for g in range(3)])
+    inheritance = np.array([
+        [[gene_probability(g, m, f) for g in range(3)] for f in range(3)]
+        for m in range(3)
+    ])
+    trait = np.array([
+        [PROBS["trait"][g][False], PROBS["trait"][g][True], 1]
+        for g in range(3)
+    ])
+    return gene, inheritance, trait
+
+
+def family_arrays(pedigree):
+    """
+    Return `(mothers, fathers, traits)` NumPy arrays for `pedigree`:
+    each person's mother's and father's index (-1 if unknown), and their
+    observed trait (1 or 0, or -1 if the trait was not observed).
+    """
+    import numpy as np
+
+    mothers = np.array(pedigree.mothers, dtype=np.intp)
+    fathers = np.array(pedigree.fathers, dtype=np.intp)
+    traits = np.array([
+        int(trait) if observed else -1
+        for observed, trait in zip(pedigree.observed, pedigree.traits)
+    ], dtype=np.int8)
+    return mothers, fathers, traits
+
+
+def joint_probabilities(mothers, fathers, genes, traits, tables=None):
+    """
+    Compute and return the joint probabilities of many assignments at once.
+
+    `genes` is an integer array of shape (assignments, people) holding
+    each person's number of genes in each assignment, and `traits` an
+    array of the same shape (or broadcastable to it) holding 1 if the
+    person has the trait, 0 if not, or -1 to sum the trait out.
+    `mothers` and `fathers` hold each person's parents' indices, as
+    returned by `family_arrays`.
+    """
+    import numpy as np
+
+    gene, inheritance, trait = tables or probability_tables()
+    founders = mothers < 0
+    children = ~founders
+
+    p = np.prod(gene[genes[:, founders]], axis=1)
+    p *= np.prod(inheritance[
+        genes[:, mothers[children]],
+        genes[:, fathers[children]],
+        genes[:, children],
+    ], axis=1)
+    p *= np.prod(trait[genes, np.broadcast_to(traits, genes.shape)], axis=1)
+    return p
+
+
+def vectorized_enumeration(pedigree, batch_size=BATCH_SIZE):
+    """
+    Compute gene and trait probabilities for everyone in `pedigree` by
+    evaluating every gene assignment in batches of `batch_size` with
+    NumPy, summing unobserved traits out analytically, and accumulating
+    marginals with scatter-adds.
+    """
+    import numpy as np
+
+    mothers, fathers, traits = family_arrays(pedigree)
+    tables = probability_tables()
+    n = len(pedigree)
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    columns = np.arange(n) * 3
+
+    gene_totals = np.zeros(3 * n)
+    trait_totals = np.zeros((n, 2))
+    for start in range(0, 3 ** n, batch_size):
+        assignments = np.arange(start, min(start + batch_size, 3 ** n))
+        genes = (assignments[:, None] // powers) % 3
+        p = joint_probabilities(mothers, fathers, genes, traits, tables)
+
+        # Probability of each trait value for each person in each assignment
+        have_trait = np.where(traits < 0, tables[2][genes, 1], traits == 1)
+        lack_trait = np.where(traits < 0, tables[2][genes, 0], traits == 0)
+        gene_totals += np.bincount(
+            (columns + genes).ravel(),
+            weights=np.repeat(p, n),
+            minlength=3 * n,
+        )
+        trait_totals += np.stack([p @ lack_trait, p @ have_trait], axis=1)
+
+    return pedigree.results(
+        gene_totals.reshape(n, 3).tolist(), trait_totals.tolist()
+    )
+
+
+def conditional_tables():
+    """
+    Return `(prior, inheritance, trait)` lists of probabilities from
+    `PROBS`, indexed like the arrays of `probability_tables`.
+    """
+    prior = [PROBS["gene"][g] for g in range(3)]
+    inheritance = [
+        [[gene_probability(g, m, f) for g in range(3)] for f in range(3)]
+        for m in range(3)
+    ]
+    trait = [[PROBS["trait"][g][False], PROBS["trait"][g][True]] for g in range(3)]
+    return prior, inheritance, trait
+
+
+def sample_likelihood_weighting(pedigree, samples, seed, deadline, batch_size):
+    """
+    Draw up to `samples` likelihood-weighted samples from `pedigree`, in
+    batches of up to `batch_size` samples or `1 / BATCHES` of the time
+    until `deadline`, stopping early at `deadline`.
+
+    Return a list of `(log_weight, genes, traits)` batch summaries,
+    where `log_weight` is the log of the total weight of the batch, and
+    `genes` and `traits` are the batch's estimates of each person's
+    gene distribution and probability of having the trait.
+    """
+    mothers = pedigree.mothers
+    fathers = pedigree.fathers
+    observed = pedigree.observed
+    traits = pedigree.traits
+    prior, inheritance, trait_table = conditional_tables()
+    rng = random.Random(seed)
+    n = len(pedigree)
+    order = range(n)
+    values = (0, 1, 2)
+    batches = []
+
+    batch_seconds = (deadline - time.monotonic()) / BATCHES
+    while samples > 0 and time.monotonic() < deadline:
+        batch_deadline = min(deadline, time.monotonic() + batch_seconds)
+
+        # Weighted sums, scaled by exp(-scale) to avoid underflow
+        scale = -math.inf
+        total = 0
+        gene_sums = [[0, 0, 0] for _ in range(n)]
+        trait_sums = [0] * n
+
+        for _ in range(min(batch_size, samples)):
+            if time.monotonic() >= batch_deadline:
+                break
+            genes = [0] * n
+            log_weight = 0
+            for i in order:
+                if mothers[i] < 0:
+                    distribution = prior
+                else:
+                    distribution = inheritance[genes[mothers[i]]][genes[fathers[i]]]
+                genes[i] = g = rng.choices(values, distribution)[0]
+                if observed[i]:
+                    log_weight += math.log(trait_table[g][traits[i]])
+
+            if log_weight > scale:
+                factor = math.exp(scale - log_weight)
+                total *= factor
+                for i in order:
+                    gene_sums[i] = [value * factor for value in gene_sums[i]]
+                    trait_sums[i] *= factor
+                scale = log_weight
+            weight = math.exp(log_weight - scale)
+
+            total += weight
+            for i in order:
+                gene_sums[i][genes[i]] += weight
+                if not observed[i]:
+                    trait_sums[i] += weight * trait_table[genes[i]][True]
+                elif traits[i]:
+                    trait_sums[i] += weight
+            samples -= 1
+
+        if not total:
+            break
+        batches.append((
+            scale + math.log(total),
+            [[value / total for value in sums] for sums in gene_sums],
+            [value / total for value in trait_sums],
+        ))
+
+    return batches
+
+
+def sample_gibbs(pedigree, samples, seed, deadline, batch_size):
+    """
+    Run up to `samples` sweeps of Gibbs sampling over `pedigree`, batched
+    and stopping early at time `deadline` like `sample_likelihood_weighting`.
+    The first `BURN_IN` fraction of sweeps (or of the time until
+    `deadline`) is discarded.
+
+    Return a list of batch summaries like `sample_likelihood_weighting`,
+    with every batch given equal weight. Estimates are Rao-Blackwellised:
+    each sweep contributes every person's full conditional distribution.
+    """
+    mothers = pedigree.mothers
+    fathers = pedigree.fathers
+    observed = pedigree.observed
+    traits = pedigree.traits
+    children = pedigree.children
+    prior, inheritance, trait_table = conditional_tables()
+    rng = random.Random(seed)
+    n = len(pedigree)
+    order = range(n)
+    values = (0, 1, 2)
+    batches = []
+
+    def conditional(i, genes):
+        """Return the distribution of person `i`'s genes given all others."""
+        if mothers[i] < 0:
+            distribution = list(prior)
+        else:
+            distribution = list(inheritance[genes[mothers[i]]][genes[fathers[i]]])
+        for g in values:
+            if observed[i]:
+                distribution[g] *= trait_table[g][traits[i]]
+            for child, other in children[i]:
+                if mothers[child] == i:
+                    distribution[g] *= inheritance[g][genes[other]][genes[child]]
+                else:
+                    distribution[g] *= inheritance[genes[other]][g][genes[child]]
+        total = sum(distribution)
+        return [p / total for p in distribution]
+
+    # Start from a sample of the prior, then burn in
+    genes = [0] * n
+    for i in order:
+        if mothers[i] < 0:
+            distribution = prior
+        else:
+            distribution = inheritance[genes[mothers[i]]][genes[fathers[i]]]
+        genes[i] = rng.choices(values, distribution)[0]
+    start = time.monotonic()
+    burn_in_deadline = start + (deadline - start) * BURN_IN
+    for _ in range(int(samples * BURN_IN)):
+        if time.monotonic() >= burn_in_deadline:
+            break
+        for i in order:
+            genes[i] = rng.choices(values, conditional(i, genes))[0]
+    samples -= int(samples * BURN_IN)
+
+    batch_seconds = (deadline - time.monotonic()) / BATCHES
+    while samples > 0 and time.monotonic() < deadline:
+        batch_deadline = min(deadline, time.monotonic() + batch_seconds)
+        gene_sums = [[0, 0, 0] for _ in range(n)]
+        trait_sums = [0] * n
+        sweeps = 0
+        for _ in range(min(batch_size, samples)):
+            if time.monotonic() >= batch_deadline:
+                break
+            sweeps += 1
+            for i in order:
+                distribution = conditional(i, genes)
+                genes[i] = rng.choices(values, distribution)[0]
+                for g in values:
+                    gene_sums[i][g] += distribution[g]
+                if not observed[i]:
+                    trait_sums[i] += sum(
+                        distribution[g] * trait_table[g][True] for g in values
+                    )
+                elif traits[i]:
+                    trait_sums[i] += 1
+        samples -= sweeps
+        if not sweeps:
+            break
+        batches.append((
+            0,
+            [[value / sweeps for value in sums] for sums in gene_sums],
+            [value / sweeps for value in trait_sums],
+        ))
+
+    return batches
+
+
+def sample_probabilities(pedigree, sampler, samples=SAMPLES, seed=SEED,
+                         processes=PROCESSES, time_limit=TIME_LIMIT):
+    """
+    Estimate gene and trait probabilities for everyone in `pedigree` with
+    `sampler` (`sample_likelihood_weighting` or `sample_gibbs`), using
+    `samples` samples split across `processes` worker processes, each
+    seeded from `seed` and stopping after `time_limit` seconds.
+
+    Return `(probabilities, errors)`, where `errors` has the same shape
+    as `probabilities` and holds standard errors estimated from the
+    spread of the estimates of independent batches of samples.
+    """
+    if not len(pedigree):
+        return dict(), dict()
+
+    processes = max(1, min(processes or 1, samples))
+    deadline = time.monotonic() + (time_limit or math.inf)
+    batch_size = max(1, samples // (processes * BATCHES))
+    jobs = [
+        (
+            pedigree,
+            samples // processes + (k < samples % processes),
+            None if seed is None else f"{seed}/{k}",
+            deadline,
+            batch_size,
+        )
+        for k in range(processes)
+    ]
+    if processes == 1:
+        batches = sampler(*jobs[0])
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            batches = [
+                batch for result in pool.starmap(sampler, jobs)
+                for batch in result
+            ]
+    if not batches:
+        raise RuntimeError("no samples were drawn within the time limit")
+
+    # Pool batches in proportion to their total weight
+    scale = max(log_weight for log_weight, _, _ in batches)
+    weights = [math.exp(log_weight - scale) for log_weight, _, _ in batches]
+    total = sum(weights)
+    weights = [weight / total for weight in weights]
+    effective = 1 / sum(weight ** 2 for weight in weights)
+
+    def combine(estimates):
+        """Return the pooled estimate and its standard error."""
+        mean = sum(w * x for w, x in zip(weights, estimates))
+        if len(estimates) < 2:
+            return mean, math.nan
+        variance = sum(w * (x - mean) ** 2 for w, x in zip(weights, estimates))
+        return mean, math.sqrt(variance / (effective - 1) if effective > 1 else 0)
+
+    estimates = [[None, None] for _ in range(len(pedigree))]
+    errors = [[None, None] for _ in range(len(pedigree))]
+    for i in range(len(pedigree)):
+        genes = [combine([batch[1][i][g] for batch in batches]) for g in range(3)]
+        mean, error = combine([batch[2][i] for batch in batches])
+        mean = min(max(mean, 0), 1)
+        estimates[i] = [[p for p, _ in genes], [1 - mean, mean]]
+        errors[i] = [[e for _, e in genes], [error, error]]
+
+    return (
+        pedigree.results(*zip(*estimates), normalize=False),
+        pedigree.results(*zip(*errors), normalize=False),
+    )
+
+
+METHODS = {
+    "enumerate": enumerate_probabilities,
+    "pruned": pruned_enumeration,
+    "vectorized": vectorized_enumeration,
+    "elimination": variable_elimination,
+}
+
+SAMPLERS = {
+    "likelihood": sample_likelihood_weighting,
+    "gibbs": sample_gibbs,
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,261 @@
+"""
+Benchmark the model checking engines in logic.py on generated problems.
+
+Usage: python benchmark.py [--sizes N [N ...]] [--families F [F ...]]
+                           [--results FILE] [--baseline FILE] [--tolerance T]
+
+Problems come in three families: random k-CNF formulas near the
+satisfiability threshold, pigeonhole formulas (which are unsatisfiable,
+so entail everything) and knights-and-knaves puzzles with many islanders.
+Each size is a number of symbols. Every engine is timed on each problem
+it can handle, and the engines' answers are cross-checked.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+import logic
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+SIZES = [8, 12, 16, 20, 24, 40, 60]
+FAMILIES = ["kcnf", "pigeonhole", "knights"]
+SEED = 0
+
+# Literals per clause and clauses per symbol of random k-CNF formulas
+CLAUSE_LENGTH = 3
+CLAUSE_RATIO = 4.26
+
+# Largest number of symbols each engine is run with; every engine but
+# the SAT solver enumerates all 2 ** n models
+ENGINES = [
+    ("recursive_check", logic.recursive_check, 16),
+    ("compiled", lambda knowledge, query: logic.model_check(
+        knowledge, query, "compiled"), 22),
+    ("parallel", lambda knowledge, query: logic.model_check(
+        knowledge, query, "parallel"), 22),
+    ("truth_table", lambda knowledge, query: logic.model_check(
+        knowledge, query, "truth_table"), logic.TRUTH_TABLE_SYMBOLS),
+    ("sat_check", logic.sat_check, float("inf")),
+]
+
+
+def random_kcnf(n, seed=SEED):
+    """
+    Return a random k-CNF formula over `n` symbols with `CLAUSE_LENGTH`
+    distinct symbols per clause, and a random literal to query.
+    """
+    rng = random.Random(seed)
+    symbols = [Symbol(f"P{i}") for i in range(n)]
+
+    def literal(symbol):
+        return symbol if rng.random() < 0.5 else Not(symbol)
+
+    clauses = [
+        Or(*map(literal, rng.sample(symbols, min(CLAUSE_LENGTH, n))))
+        for _ in range(round(CLAUSE_RATIO * n))
+    ]
+    return And(*clauses), literal(rng.choice(symbols))
+
+
+def pigeonhole(n):
+    """
+    Return a formula stating that `holes + 1` pigeons each sit in one of
+    `holes` holes, with no two in the same hole, where `holes` is the
+    largest number for which that takes at most `n` symbols. Also return
+    one of its symbols to query.
+    """
+    holes = 1
+    while (holes + 1) * (holes + 2) <= n:
+        holes += 1
+    pigeons = holes + 1
+    sits = [
+        [Symbol(f"Pigeon {p} in hole {h}") for h in range(holes)]
+        for p in range(pigeons)
+    ]
+    knowledge = And(*(Or(*sits[p]) for p in range(pigeons)))
+    for h in range(holes):
+        for p in range(pigeons):
+            for q in range(p + 1, pigeons):
+                knowledge = knowledge.with_conjunct(
+                    Not(And(sits[p][h], sits[q][h]))
+                )
+    return knowledge, sits[0][0]
+
+
+def knights(n, seed=SEED):
+    """
+    Return a knights-and-knaves puzzle with `n // 2` islanders, each of
+    whom makes a random statement about others that is consistent with a
+    hidden assignment of knights and knaves, and the symbols stating
+    that each islander is a knight.
+    """
+    rng = random.Random(seed)
+    islanders = max(n // 2, 1)
+    knight = [Symbol(f"{i} is a Knight") for i in range(islanders)]
+    knave = [Symbol(f"{i} is a Knave") for i in range(islanders)]
+    hidden = [rng.random() < 0.5 for _ in range(islanders)]
+
+    knowledge = And()
+    for i in range(islanders):
+        # Everyone is either a knight or a knave, but not both
+        knowledge = knowledge.with_conjunct(Or(knight[i], knave[i]))
+        knowledge = knowledge.with_conjunct(Not(And(knight[i], knave[i])))
+
+        # Make a true statement if a knight, and a false one if a knave
+        a, b = rng.choice(range(islanders)), rng.choice(range(islanders))
+        statement, truth = rng.choice([
+            (knave[a], not hidden[a]),
+            (knight[a], hidden[a]),
+            (Biconditional(knight[a], knight[b]), hidden[a] == hidden[b]),
+            (And(knight[a], knave[b]), hidden[a] and not hidden[b]),
+            (Or(knave[a], knight[b]), not hidden[a] or hidden[b]),
+            (Implication(knight[a], knave[b]), not hidden[a] or not hidden[b]),
+        ])
+        if truth != hidden[i]:
+            statement = Not(statement)
+        knowledge = knowledge.with_conjunct(Implication(knight[i], statement))
+        knowledge = knowledge.with_conjunct(
+            Implication(knave[i], Not(statement))
+        )
+    return knowledge, knight
+
+
+GENERATORS = {
+    "kcnf": random_kcnf,
+    "pigeonhole": lambda n, seed: pigeonhole(n),
+    "knights": knights,
+}
+
+
+def measure(function, *args):
+    """Return the result of `function(*args)` and its wall-clock time."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(sizes, families=FAMILIES, seed=SEED):
+    """
+    Benchmark every engine on a problem of each family and size.
+    Return a list of result dictionaries, one per engine and problem.
+    """
+    results = []
+    for family in families:
+        for n in sizes:
+            knowledge, queries = GENERATORS[family](n, seed)
+            if not isinstance(queries, list):
+                queries = [queries]
+            symbols = len(knowledge.symbols().union(
+                *(query.symbols() for query in queries)
+            ))
+
+            answers = dict()
+            problem = []
+            for name, engine, limit in ENGINES:
+                result = {"engine": name, "family": family, "symbols": symbols}
+                if symbols > limit:
+                    result["skipped"] = True
+                    problem.append(result)
+                    continue
+                try:
+                    answer, elapsed = measure(
+                        lambda: [engine(knowledge, q) for q in queries]
+                    )
+                except Exception as e:
+                    result["failed"] = repr(e)
+                    problem.append(result)
+                    print(f"{name:>16} {family:>10} {symbols:>5} symbols: "
+                          f"failed with {e!r}")
+                    continue
+                answers[name] = answer
+                result["seconds"] = elapsed
+                result["entailed"] = sum(answer)
+                problem.append(result)
+
+            # Every engine that finished must agree with the first one
+            expected = next(iter(answers.values()), None)
+            for result in problem:
+                if result["engine"] in answers:
+                    result["correct"] = answers[result["engine"]] == expected
+                    report(result)
+            results.extend(problem)
+    return results
+
+
+def report(result):
+    """Print a single benchmark result."""
+    line = (
+        f"{result['engine']:>16} {result['family']:>10} "
+        f"{result['symbols']:>5} symbols: {result['seconds']:9.3f}s  "
+        f"{result['entailed']} entailed"
+    )
+    if not result["correct"]:
+        line += "  MISMATCH"
+    print(line, flush=True)
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Return descriptions of results that are slower than `tolerance`
+    times the matching entry in `baseline`, or that disagree with the
+    other engines.
+    """
+    previous = {
+        (r["engine"], r["family"], r["symbols"]): r for r in baseline
+    }
+    found = []
+    for result in results:
+        problem = (f"{result['engine']} ({result['family']}, "
+                   f"{result['symbols']} symbols)")
+        if result.get("correct") is False:
+            found.append(f"{problem} disagreed with the other engines")
+        old = previous.get(
+            (result["engine"], result["family"], result["symbols"])
+        )
+        if not old or "seconds" not in old:
+            continue
+        if "seconds" not in result:
+            found.append(f"{problem} did not complete: "
+                         f"{result.get('failed', 'skipped')}")
+        elif result["seconds"] > old["seconds"] * tolerance:
+            found.append(f"{problem} took {result['seconds']:.3f}s, "
+                         f"baseline {old['seconds']:.3f}s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="problem sizes to benchmark, in symbols")
+    parser.add_argument("--families", nargs="+", default=FAMILIES,
+                        choices=FAMILIES, help="problem families to generate")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--results", help="write results to this JSON file")
+    parser.add_argument("--baseline",
+                        help="compare against results from a previous run")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown relative to the baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.families, args.seed)
+
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    found = regressions(results, baseline, args.tolerance)
+    for regression in found:
+        print(f"Regression: {regression}")
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,77 @@
+"""
+Propositional logic sentences and model checking.
+
+Sentences are hash-consed and immutable: building a sentence equal to an
+existing one returns that object. Unlike earlier versions, `And.add`
+no longer changes a conjunction in place and raises TypeError; use
+`knowledge = knowledge.with_conjunct(sentence)` instead.
+"""
+
+import heapq
+import importlib.util
 import itertools
+import multiprocessing
+import os
+import weakref
+
+# Largest number of symbols to check with truth tables, which take
+# 2 ** (n - 3) bytes each
+TRUTH_TABLE_SYMBOLS = 26
+
+# Number of partitions of the models per process in parallel checks
+PARTITIONS_PER_PROCESS = 4
+
+
+class Interned(type):
+    """
+    Metaclass that hash-conses sentences: constructing a sentence that is
+    structurally identical to one that already exists returns the
+    existing object, so that sentences form a DAG with shared subsentences.
+    Interned sentences are immutable, and compute their hash and set of
+    symbols once, when they are created.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        sentence = super().__call__(*args, **kwargs)
+        key = (cls, sentence._arguments())
+        existing = Sentence.interned.get(key)
+        if existing is not None:
+            return existing
+
+        object.__setattr__(sentence, "_hash", hash(key))
+        object.__setattr__(sentence, "_symbols", frozenset().union(*(
+            {argument} if isinstance(sentence, Symbol) else argument._symbols
+            for argument in key[1]
+        )))
+        Sentence.interned[key] = sentence
+        return sentence
+
+
+class Sentence(metaclass=Interned):
+
+    # Every sentence in use, keyed by its class and arguments
+    interned = weakref.WeakValueDictionary()
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_hash"):
+            raise AttributeError("sentences are immutable")
+        object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        return self is other or (
+            type(self) is type(other)
+            and self._arguments() == other._arguments()
+        )
+
+    def __hash__(self):
+        return self._hash
 
+    def __reduce__(self):
+        return type(self), self._arguments()
 
-class Sentence():
+    def _arguments(self):
+        """Returns the arguments the sentence was constructed from."""
+        return ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +83,36 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return self._symbols
+
+    def subsentences(self):
+        """Returns the sentences the logical sentence is made of."""
+        return self._arguments()
+
+    def expression(self, index):
+        """
+        Returns a Python expression evaluating the logical sentence in a
+        model packed into the bits of an integer `m`, where `index` maps
+        each symbol to the position of its bit, and may map sentences to
+        names of variables that already hold their values.
+        """
+        return index.get(self) or self._expression(index)
+
+    def _expression(self, index):
+        raise Exception("nothing to compile")
+
+    def truth_table(self, columns):
+        """
+        Returns the truth table of the logical sentence as a NumPy array
+        of bit-packed 64-bit words, given `columns`, which maps each
+        symbol to its own truth table and True to a table of all ones,
+        and may map sentences to their already computed truth tables.
+        """
+        table = columns.get(self)
+        return table if table is not None else self._truth_table(columns)
+
+    def _truth_table(self, columns):
+        raise Exception("nothing to tabulate")
 
     @classmethod
     def validate(cls, sentence):
@@ -47,11 +146,8 @@ class Symbol(Sentence):
     def __init__(self, name):
         self.name = name
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def _arguments(self):
+        return (self.name,)
 
     def __repr__(self):
         return self.name
@@ -65,8 +161,14 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def subsentences(self):
+        return ()
+
+    def _expression(self, index):
+        return f"(m >> {index[self.name]} & 1)"
+
+    def _truth_table(self, columns):
+        return columns[self.name]
 
 
 class Not(Sentence):
@@ -74,11 +176,8 @@ class Not(Sentence):
         Sentence.validate(operand)
         self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
-
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def _arguments(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +188,21 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def _expression(self, index):
+        return f"(not {self.operand.expression(index)})"
+
+    def _truth_table(self, columns):
+        return ~self.operand.truth_table(columns)
 
 
 class And(Sentence):
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        self.conjuncts = tuple(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def _arguments(self):
+        return self.conjuncts
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +211,22 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        """
+        Raises TypeError: sentences are immutable, so a conjunction cannot
+        be added to in place. Use `with_conjunct` instead.
+        """
+        raise TypeError(
+            "sentences are immutable; use knowledge = "
+            "knowledge.with_conjunct(sentence) instead of add"
+        )
+
+    def with_conjunct(self, conjunct):
+        """
+        Returns a new conjunction of this one's conjuncts and `conjunct`,
+        leaving this conjunction unchanged.
+        """
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +237,28 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def _expression(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(index) for conjunct in self.conjuncts
+        ) + ")"
+
+    def _truth_table(self, columns):
+        table = columns[True].copy()
+        for conjunct in self.conjuncts:
+            table &= conjunct.truth_table(columns)
+        return table
 
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        self.disjuncts = tuple(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def _arguments(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,8 +273,18 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def _expression(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(index) for disjunct in self.disjuncts
+        ) + ")"
+
+    def _truth_table(self, columns):
+        table = ~columns[True]
+        for disjunct in self.disjuncts:
+            table |= disjunct.truth_table(columns)
+        return table
 
 
 class Implication(Sentence):
@@ -168,13 +294,8 @@ class Implication(Sentence):
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def _arguments(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,8 +309,14 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def _expression(self, index):
+        antecedent = self.antecedent.expression(index)
+        consequent = self.consequent.expression(index)
+        return f"(not {antecedent} or {consequent})"
+
+    def _truth_table(self, columns):
+        return (~self.antecedent.truth_table(columns)
+                | self.consequent.truth_table(columns))
 
 
 class Biconditional(Sentence):
@@ -199,34 +326,365 @@ class Biconditional(Sentence):
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def _arguments(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def _expression(self, index):
+        left = self.left.expression(index)
+        right = self.right.expression(index)
+        return f"((not {left}) == (not {right}))"
+
+    def _truth_table(self, columns):
+        return ~(self.left.truth_table(columns)
+                 ^ self.right.truth_table(columns))
+
+
+def shared_subsentences(*sentences):
+    """
+    Returns the compound subsentences that occur more than once among
+    `sentences`, in an order in which every subsentence comes before
+    the sentences that contain it.
+    """
+    occurrences = dict()
+    order = []
+    stack = [(sentence, False) for sentence in reversed(sentences)]
+    while stack:
+        sentence, visited = stack.pop()
+        if visited:
+            order.append(sentence)
+            continue
+        occurrences[sentence] = occurrences.get(sentence, 0) + 1
+        if occurrences[sentence] == 1:
+            stack.append((sentence, True))
+            stack.extend(
+                (subsentence, False)
+                for subsentence in reversed(sentence.subsentences())
+            )
+    return [
+        sentence for sentence in order
+        if occurrences[sentence] > 1 and sentence.subsentences()
+    ]
+
+
+def bind_shared(shared, index, indent):
+    """
+    Returns lines of Python assigning the values of the `shared`
+    sentences to local variables, and maps them to those in `index`.
+    """
+    lines = []
+    for sentence in shared:
+        name = f"s{len(index)}"
+        lines.append(f"{indent}{name} = {sentence.expression(index)}\n")
+        index[sentence] = name
+    return lines
+
+
+def compile_source(source, name):
+    """Compiles Python `source` and returns the function called `name`."""
+    namespace = dict()
+    exec(compile(source, f"<{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compiles `sentence` into a function of a model packed into the bits
+    of an integer, where bit `i` holds the value of `symbols[i]`.
+    Subsentences that occur more than once are evaluated only once.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    try:
+        lines = bind_shared(shared_subsentences(sentence), index, "    ")
+        return compile_source(
+            "def evaluate(m):\n"
+            + "".join(lines)
+            + f"    return {sentence.expression(index)}\n",
+            "evaluate",
+        )
+    except (SyntaxError, RecursionError, MemoryError):
+        # Too deeply nested for the Python compiler
+        return lambda m: sentence.evaluate({
+            symbol: m >> i & 1 for symbol, i in index.items()
+        })
+
+
+def compile_check(knowledge, query, symbols):
+    """
+    Compiles a function of `limit` and optional `start` that checks
+    whether knowledge entails query in every model packed into an
+    integer from `start` up to `limit`, with the symbols packed in the
+    order of `symbols`. Subsentences that occur
+    more than once are evaluated only once per model.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    shared = shared_subsentences(knowledge, query)
+    # Shared subsentences of the knowledge are bound before testing it,
+    # those only in the query once the knowledge holds
+    in_knowledge = set(shared_subsentences(knowledge, knowledge))
+    try:
+        source = (
+            "def check(limit, start=0):\n"
+            "    for m in range(start, limit):\n"
+            + "".join(bind_shared(
+                [s for s in shared if s in in_knowledge], index, "        "
+            ))
+            + f"        if {knowledge.expression(index)}:\n"
+            + "".join(bind_shared(
+                [s for s in shared if s not in in_knowledge], index,
+                "            "
+            ))
+            + f"            if not {query.expression(index)}:\n"
+            "                return False\n"
+            "    return True\n"
+        )
+        return compile_source(source, "check")
+    except (SyntaxError, RecursionError, MemoryError):
+        knowledge = compile_sentence(knowledge, symbols)
+        query = compile_sentence(query, symbols)
+        return lambda limit, start=0: all(
+            query(m) for m in range(start, limit) if knowledge(m)
+        )
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def symbol_columns(symbols):
+    """
+    Returns the truth tables of `symbols` over all of their models, as
+    NumPy arrays of 64-bit words, in the format of `Sentence.truth_table`.
+    Model `m` is at bit `m % 64` of word `m // 64`, and assigns
+    `symbols[i]` the value of bit `i` of `m`. Also returns a mask of the
+    bits that hold models, as there are fewer than 64 if there are fewer
+    than 6 symbols.
+    """
+    import numpy as np
+
+    words = max(1, 1 << max(0, len(symbols) - 6))
+    word = np.arange(words, dtype=np.uint64)
+    columns = {True: np.full(words, np.iinfo(np.uint64).max, dtype=np.uint64)}
+    for i, symbol in enumerate(symbols):
+        if i < 6:
+            # Within a word, alternate runs of 2 ** i zeros and ones
+            pattern = sum(1 << m for m in range(64) if m >> i & 1)
+            columns[symbol] = np.full(words, pattern, dtype=np.uint64)
+        else:
+            columns[symbol] = np.where(
+                (word >> np.uint64(i - 6)) & np.uint64(1), columns[True], 0
+            ).astype(np.uint64)
+
+    mask = columns[True].copy()
+    if len(symbols) < 6:
+        mask[0] = (1 << (1 << len(symbols))) - 1
+    return columns, mask
+
+
+def truth_table_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both over all
+    models at once, as bit-parallel truth tables. The truth table of each
+    subsentence that occurs more than once is computed only once.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    if len(symbols) > TRUTH_TABLE_SYMBOLS:
+        raise ValueError(
+            f"too many symbols for a truth table: {len(symbols)}"
+        )
+    columns, mask = symbol_columns(symbols)
+    for sentence in shared_subsentences(knowledge, query):
+        columns[sentence] = sentence.truth_table(columns)
+    counterexamples = (knowledge.truth_table(columns)
+                       & ~query.truth_table(columns) & mask)
+    return not counterexamples.any()
+
+
+def default_method(symbol_count):
+    """
+    Returns the model checking method to use for `symbol_count` symbols:
+    "truth_table" if NumPy is available and there are at most
+    `TRUTH_TABLE_SYMBOLS` symbols, "compiled" if NumPy is missing, and
+    "sat" above that.
+    """
+    if symbol_count > TRUTH_TABLE_SYMBOLS:
+        return "sat"
+    if importlib.util.find_spec("numpy") is None:
+        return "compiled"
+    return "truth_table"
+
+
+def model_check(knowledge, query, method=None):
+    """
+    Checks if knowledge base entails query.
+
+    `method` is "compiled", to check models one at a time with compiled
+    sentences, "parallel", to do so in a process pool with
+    `parallel_check`, "truth_table", to check all of them at once with
+    `truth_table_check`, or "sat", to search for a counterexample with
+    `sat_check`. By default, the method is chosen by `default_method`.
+    """
+
+    # Get all symbols in both knowledge and query
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    if method is None:
+        method = default_method(len(symbols))
+
+    if method == "truth_table":
+        return truth_table_check(knowledge, query)
+    if method == "parallel":
+        return parallel_check(knowledge, query)
+    if method == "sat":
+        return sat_check(knowledge, query)
+    if method != "compiled":
+        raise ValueError(f"unknown model checking method {method!r}")
+
+    # Check that knowledge entails query in every model
+    check = compile_check(knowledge, query, symbols)
+    return check(1 << len(symbols))
+
+
+def model_check_all(knowledge, queries, method=None):
+    """
+    Checks which of `queries` a knowledge base entails, enumerating the
+    models of the knowledge base only once.
+
+    Returns a list with, for each query, True if the knowledge base
+    entails it, False if the knowledge base entails its negation, or None
+    if neither is entailed. If the knowledge base has no models, it
+    entails every query. `method` is "compiled", "truth_table" or "sat",
+    chosen by `default_method` if not given, as for `model_check`.
+    """
+    queries = list(queries)
+    symbols = sorted(knowledge.symbols().union(
+        *(query.symbols() for query in queries)
+    ))
+
+    if method is None:
+        method = default_method(len(symbols))
+
+    if method == "sat":
+        cnf = CNF()
+        cnf.add(knowledge)
+        literals = [cnf.literal(query) for query in queries]
+        model = solve(cnf.clauses, cnf.variables)
+        if model is None:
+            return [True] * len(queries)
+
+        # A model of the knowledge base already gives each query one
+        # value, so only the opposite value needs to be searched for
+        entailed = []
+        for literal in literals:
+            holds = model[abs(literal)] == (literal > 0)
+            opposite = solve(
+                cnf.clauses + [[-literal if holds else literal]], cnf.variables
+            ) is not None
+            entailed.append(
+                entailment(opposite, True) if holds
+                else entailment(True, opposite)
+            )
+        return entailed
+
+    if method == "truth_table":
+        if len(symbols) > TRUTH_TABLE_SYMBOLS:
+            raise ValueError(
+                f"too many symbols for a truth table: {len(symbols)}"
+            )
+        columns, mask = symbol_columns(symbols)
+        for sentence in shared_subsentences(knowledge, *queries):
+            columns[sentence] = sentence.truth_table(columns)
+        models = knowledge.truth_table(columns) & mask
+        entailed = []
+        for query in queries:
+            table = query.truth_table(columns)
+            entailed.append(entailment(
+                (models & ~table).any(), (models & table).any()
+            ))
+        return entailed
+    if method != "compiled":
+        raise ValueError(f"unknown model checking method {method!r}")
+
+    # Keep the models of the knowledge base, then evaluate queries in them
+    evaluate = compile_sentence(knowledge, symbols)
+    models = [m for m in range(1 << len(symbols)) if evaluate(m)]
+    entailed = []
+    for query in queries:
+        evaluate = compile_sentence(query, symbols)
+        values = {bool(evaluate(m)) for m in models}
+        entailed.append(entailment(False in values, True in values))
+    return entailed
+
+
+def entailment(false, true):
+    """
+    Returns True, False or None for a query that is false in some model
+    of the knowledge base if `false`, and true in some if `true`.
+    """
+    if not false:
+        return True
+    if not true:
+        return False
+    return None
+
+
+# Compiled check of the knowledge and query in a parallel check's worker
+partition_check = None
+
+
+def initialize_partitions(knowledge, query, symbols):
+    """Compiles the check once in each worker process."""
+    global partition_check
+    partition_check = compile_check(knowledge, query, symbols)
+
+
+def check_partition(bounds):
+    """Checks the models from `bounds[0]` up to `bounds[1]`."""
+    start, stop = bounds
+    return partition_check(stop, start)
+
+
+def parallel_check(knowledge, query, processes=None, partition_symbols=None):
+    """
+    Checks if knowledge base entails query by fixing the values of the
+    first `partition_symbols` symbols to split the models into
+    independent partitions, which are checked in a pool of `processes`
+    processes. As soon as any partition contains a model of the knowledge
+    in which the query is false, the remaining ones are abandoned.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    processes = processes or os.cpu_count()
+    if partition_symbols is None:
+        partition_symbols = (processes * PARTITIONS_PER_PROCESS - 1).bit_length()
+    partition_symbols = min(partition_symbols, len(symbols))
+
+    # Pack the partitioning symbols into the highest bits of the models,
+    # so that each partition is a contiguous range of them
+    symbols = symbols[partition_symbols:] + symbols[:partition_symbols]
+    size = 1 << (len(symbols) - partition_symbols)
+    partitions = [
+        (p * size, (p + 1) * size) for p in range(1 << partition_symbols)
+    ]
+
+    with multiprocessing.Pool(
+        processes, initializer=initialize_partitions,
+        initargs=(knowledge, query, symbols)
+    ) as pool:
+        # Leaving the pool terminates workers still checking partitions
+        return all(pool.imap_unordered(check_partition, partitions))
+
+
+def recursive_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by recursively enumerating
+    models and evaluating sentences in each.
+    """
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +715,303 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+class CNF():
+    """
+    Conjunctive normal form of logical sentences, built with the Tseitin
+    encoding: every compound subsentence gets a fresh variable that is
+    constrained to be equivalent to it, so the number of clauses grows
+    linearly with the size of the sentences rather than exponentially.
+
+    Variables are positive integers, and literals are variables or their
+    negations. `index` maps each symbol name to its variable.
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.index = dict()
+        self.clauses = []
+        self.literals = dict()
+
+    def variable(self):
+        """Returns a fresh variable."""
+        self.variables += 1
+        return self.variables
+
+    def true(self):
+        """Returns a literal that is always true."""
+        if True not in self.literals:
+            self.literals[True] = self.variable()
+            self.clauses.append([self.literals[True]])
+        return self.literals[True]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to `sentence`."""
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.index:
+                self.index[sentence.name] = self.variable()
+            literal = self.index[sentence.name]
+        elif isinstance(sentence, Not):
+            literal = -self.literal(sentence.operand)
+        elif isinstance(sentence, (And, Or)):
+            operands = (sentence.conjuncts if isinstance(sentence, And)
+                        else sentence.disjuncts)
+            if not operands:
+                literal = (self.true() if isinstance(sentence, And)
+                           else -self.true())
+            elif len(operands) == 1:
+                literal = self.literal(operands[0])
+            else:
+                # An And is the negation of an Or of negated operands
+                sign = -1 if isinstance(sentence, And) else 1
+                literals = [sign * self.literal(op) for op in operands]
+                literal = self.variable()
+                self.clauses.append([-literal] + literals)
+                for operand in literals:
+                    self.clauses.append([literal, -operand])
+                literal *= sign
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            literal = self.variable()
+            self.clauses.append([-literal, -antecedent, consequent])
+            self.clauses.append([literal, antecedent])
+            self.clauses.append([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.variable()
+            self.clauses.append([-literal, -left, right])
+            self.clauses.append([-literal, left, -right])
+            self.clauses.append([literal, left, right])
+            self.clauses.append([literal, -left, -right])
+        else:
+            raise TypeError(f"cannot convert {sentence!r} to CNF")
+
+        self.literals[sentence] = literal
+        return literal
+
+    def add(self, sentence):
+        """Adds clauses requiring `sentence` to be true."""
+        Sentence.validate(sentence)
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+def solve(clauses, variables):
+    """
+    Decides whether `clauses`, a list of lists of literals over variables
+    1 to `variables`, is satisfiable, by conflict-driven clause learning:
+    DPLL search with unit propagation over two watched literals per
+    clause, first-UIP clause learning with non-chronological
+    backtracking, VSIDS branching with phase saving, and Luby restarts.
+
+    Returns a satisfying model as a list of truth values indexed by
+    variable (index 0 unused), or None if the clauses are unsatisfiable.
+    """
+    value = [0] * (variables + 1)
+    level = [0] * (variables + 1)
+    reason = [None] * (variables + 1)
+    phase = [-1] * (variables + 1)
+    activity = [0.0] * (variables + 1)
+    increment = 1.0
+    watches = {literal: [] for v in range(1, variables + 1)
+               for literal in (v, -v)}
+    trail = []
+    limits = []
+    head = 0
+
+    def assign(literal, cause):
+        v = abs(literal)
+        value[v] = 1 if literal > 0 else -1
+        level[v] = len(limits)
+        reason[v] = cause
+        trail.append(literal)
+
+    def true(literal):
+        return value[abs(literal)] == (1 if literal > 0 else -1)
+
+    def false(literal):
+        return value[abs(literal)] == (-1 if literal > 0 else 1)
+
+    def add_clause(clause):
+        """Watches `clause`, returning False if it is already violated."""
+        if len(clause) == 1:
+            if false(clause[0]):
+                return False
+            if not true(clause[0]):
+                assign(clause[0], None)
+            return True
+        watches[clause[0]].append(clause)
+        watches[clause[1]].append(clause)
+        return True
+
+    def propagate():
+        """Propagates assignments, returning a conflicting clause if any."""
+        nonlocal head
+        while head < len(trail):
+            literal = -trail[head]
+            head += 1
+            watching = watches[literal]
+            kept = []
+            for k, clause in enumerate(watching):
+                if clause[0] == literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if true(clause[0]):
+                    kept.append(clause)
+                    continue
+                for j in range(2, len(clause)):
+                    if not false(clause[j]):
+                        clause[1], clause[j] = clause[j], clause[1]
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if false(clause[0]):
+                        kept.extend(watching[k + 1:])
+                        watches[literal] = kept
+                        return clause
+                    assign(clause[0], clause)
+            watches[literal] = kept
+        return None
+
+    def bump(v):
+        nonlocal increment
+        activity[v] += increment
+        if activity[v] > 1e100:
+            for u in range(1, variables + 1):
+                activity[u] *= 1e-100
+            increment *= 1e-100
+        heapq.heappush(heap, (-activity[v], v))
+
+    def analyze(conflict):
+        """Returns a learned first-UIP clause and the level to return to."""
+        learned = [None]
+        seen = set()
+        counter = 0
+        literal = None
+        index = len(trail)
+        clause = conflict
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                v = abs(other)
+                if v in seen or level[v] == 0:
+                    continue
+                seen.add(v)
+                bump(v)
+                if level[v] == len(limits):
+                    counter += 1
+                else:
+                    learned.append(other)
+            while True:
+                index -= 1
+                if abs(trail[index]) in seen:
+                    break
+            literal = trail[index]
+            clause = reason[abs(literal)]
+            counter -= 1
+            if counter == 0:
+                break
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal with the highest level second
+        best = max(range(1, len(learned)), key=lambda k: level[abs(learned[k])])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, level[abs(learned[1])]
+
+    def backjump(target):
+        nonlocal head
+        if len(limits) <= target:
+            return
+        for literal in trail[limits[target]:]:
+            v = abs(literal)
+            phase[v] = value[v]
+            value[v] = 0
+            reason[v] = None
+            heapq.heappush(heap, (-activity[v], v))
+        del trail[limits[target]:]
+        del limits[target:]
+        head = len(trail)
+
+    def luby(i):
+        """Returns the `i`th element (from 1) of the Luby sequence."""
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        while (1 << k) - 1 != i:
+            i -= (1 << (k - 1)) - 1
+            k = 1
+            while (1 << k) - 1 < i:
+                k += 1
+        return 1 << (k - 1)
+
+    for clause in clauses:
+        clause = list(dict.fromkeys(clause))
+        if not clause:
+            return None
+        if any(-literal in clause for literal in clause):
+            continue
+        if not add_clause(clause):
+            return None
+
+    heap = [(0.0, v) for v in range(1, variables + 1)]
+    restarts = 1
+    conflicts = 0
+    while True:
+        conflict = propagate()
+        if conflict is not None:
+            if not limits:
+                return None
+            conflicts += 1
+            learned, target = analyze(conflict)
+            backjump(target)
+            add_clause(learned)
+            if len(learned) > 1:
+                assign(learned[0], learned)
+            increment /= 0.95
+            continue
+
+        if conflicts >= 100 * luby(restarts):
+            restarts += 1
+            conflicts = 0
+            backjump(0)
+            continue
+
+        # Choose the unassigned variable with the highest activity
+        while heap and value[heap[0][1]]:
+            heapq.heappop(heap)
+        if not heap:
+            return [None] + [v > 0 for v in value[1:]]
+        v = heapq.heappop(heap)[1]
+        limits.append(len(trail))
+        assign(v * phase[v], None)
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, like `model_check`, by
+    deciding that knowledge ∧ ¬query is unsatisfiable with `solve`.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.clauses.append([-cnf.literal(query)])
+    return solve(cnf.clauses, cnf.variables) is None
@@ -1,6 +1,6 @@
 import itertools
+import math
 import random
-from copy import deepcopy
 
 
 class Minesweeper():
@@ -151,11 +151,12 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=8):
 
-        # Set initial height and width
+        # Set initial height, width, and number of mines
         self.height = height
         self.width = width
+        self.mine_count = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -167,12 +168,20 @@ class MinesweeperAI():
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Solutions of the components of the knowledge base, by the
+        # sentences in each, kept while those sentences are unchanged
+        self.solutions = dict()
+
+        # Mine probabilities of the unknown cells, until knowledge changes
+        self.probabilities = None
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
+        self.probabilities = None
         for sentence in self.knowledge:
             sentence.mark_mine(cell)
 
@@ -182,6 +191,7 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
+        self.probabilities = None
         for sentence in self.knowledge:
             sentence.mark_safe(cell)
 
@@ -201,11 +211,6 @@ class MinesweeperAI():
 
         return cells
 
-    def check_repeat(self, cells):
-        for sentence in self.knowledge:
-            if cells == (sentence.cells):
-                return True
-
     def add_knowledge(self, cell, count):
         """
         Called when the Minesweeper board tells us, for a given
@@ -224,44 +229,217 @@ class MinesweeperAI():
         self.moves_made.add(cell)  # mark the cell as a move that has been made
         self.mark_safe(cell)  # mark the cell as safe
 
-        # Finds out all neighboring cells of the current cell we are looking at
+        # Finds out all neighboring cells of the current cell we are looking at,
+        # leaving out those already known to be safe or mines
         neighboring_cells = self.get_neighbors(cell)
+        count -= len(neighboring_cells & self.mines)
+        neighboring_cells -= self.mines | self.safes
 
         # add a new sentence to the AI's knowledge base based on the value of `cell` and `count`
         cell_sentence = Sentence(neighboring_cells, count)
-        self.knowledge.append(cell_sentence)
+        if cell_sentence.cells and cell_sentence not in self.knowledge:
+            self.knowledge.append(cell_sentence)
 
         # mark any additional cells as safe or as mines if it can be concluded based on the AI's knowledge base
-        for sentence in self.knowledge:
-            copy = deepcopy(sentence)
-            if copy.known_mines():
-                for cell in copy.known_mines():
-                    self.mark_mine(cell)
+        self.infer()
 
-            elif copy.known_safes():
-                for cell in copy.known_safes():
+    def infer(self):
+        """
+        Marks every cell that the knowledge base proves to be safe or a
+        mine. Sentences whose cells are all known are dropped.
+
+        Cells are first marked from sentences that are all safes or all
+        mines. Then the cells in sentences are split into independent
+        components, each of which is solved exactly by counting the
+        assignments of mines to its cells that satisfy its sentences: a
+        cell that is a mine in none of them is safe, and one that is a
+        mine in all of them is a mine. Finally, cells that the number of
+        mines left makes certain, with a mine probability of 0 or 1 from
+        `mine_probabilities`, are marked too. Solutions are kept for
+        components whose sentences are unchanged by the next move.
+        """
+        while True:
+            changed = False
+            for sentence in list(self.knowledge):
+                for cell in list(sentence.known_mines() or ()):
+                    self.mark_mine(cell)
+                    changed = True
+                for cell in list(sentence.known_safes() or ()):
                     self.mark_safe(cell)
+                    changed = True
+            self.knowledge = [
+                sentence for sentence in self.knowledge if sentence.cells
+            ]
+            if changed:
+                continue
 
-        for sentence in self.knowledge:
-            if not sentence.cells:
-                self.knowledge.remove(sentence)
-
-        for sentence in self.knowledge:
-            if len(sentence.cells) == 0:
+            for cells, sentences in self.frontier_components():
+                cells, ways = self.component_solutions(cells, sentences)
+                solutions = sum(total for total, _ in ways.values())
+                for n, cell in enumerate(cells):
+                    mines = sum(counts[n] for _, counts in ways.values())
+                    if mines == 0:
+                        self.mark_safe(cell)
+                        changed = True
+                    elif mines == solutions:
+                        self.mark_mine(cell)
+                        changed = True
+            if changed:
                 continue
-            if sentence.cells and sentence.cells != cell_sentence.cells and sentence.cells.issubset(cell_sentence.cells):
-                cells = cell_sentence.cells - sentence.cells
-                count = cell_sentence.count - sentence.count
-                if self.check_repeat(cells):
-                    continue
-                self.knowledge.append(Sentence(cells, count))
 
-            elif cell_sentence.cells and cell_sentence.cells.issubset(sentence.cells) and cell_sentence.cells != sentence.cells:
-                cells = sentence.cells - cell_sentence.cells
-                count = sentence.count - cell_sentence.count
-                if self.check_repeat(cells):
+            # Use the number of mines left, which links the components
+            # to each other and to the cells outside them
+            for cell, probability in self.mine_probabilities().items():
+                if cell in self.safes:
                     continue
-                self.knowledge.append(Sentence(cells, count))
+                if probability == 0:
+                    self.mark_safe(cell)
+                    changed = True
+                elif probability == 1:
+                    self.mark_mine(cell)
+                    changed = True
+            if not changed:
+                break
+
+        # Forget the solutions of components that no longer exist
+        current = {
+            self.signature(sentences)
+            for _, sentences in self.frontier_components()
+        }
+        self.solutions = {
+            signature: solution
+            for signature, solution in self.solutions.items()
+            if signature in current
+        }
+
+    def signature(self, sentences):
+        """Returns a hashable representation of a set of sentences."""
+        return frozenset(
+            (frozenset(sentence.cells), sentence.count)
+            for sentence in sentences
+        )
+
+    def component_solutions(self, cells, sentences):
+        """
+        Returns `(cells, ways)`, where `ways` is as returned by
+        `solve_component` for the component of `cells` and `sentences`,
+        reusing the solution of an identical earlier component, whose
+        cells may be in a different order.
+        """
+        signature = self.signature(sentences)
+        if signature not in self.solutions:
+            self.solutions[signature] = (
+                cells, self.solve_component(cells, sentences)
+            )
+        return self.solutions[signature]
+
+    def frontier_components(self):
+        """
+        Splits the knowledge base into independent components, of
+        sentences linked by shared cells. Returns a list of
+        `(cells, sentences)` pairs, with the cells of each component in
+        an order in which each cell shares a sentence with an earlier one
+        where possible.
+        """
+        containing = dict()
+        for sentence in self.knowledge:
+            for cell in sentence.cells:
+                containing.setdefault(cell, []).append(sentence)
+
+        components = []
+        seen = set()
+        included = set()
+        for start in containing:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = [start]
+            sentences = []
+            for cell in cells:
+                for sentence in containing[cell]:
+                    if id(sentence) in included:
+                        continue
+                    included.add(id(sentence))
+                    sentences.append(sentence)
+                    for other in sentence.cells:
+                        if other not in seen:
+                            seen.add(other)
+                            cells.append(other)
+            components.append((cells, sentences))
+        return components
+
+    def solve_component(self, cells, sentences):
+        """
+        Counts the assignments of mines to `cells` that satisfy every one
+        of `sentences`, all of whose cells are in `cells`. Returns a
+        dictionary mapping each number of mines `k` to a pair of the
+        number of assignments with `k` mines, and a list of how many of
+        those place a mine in each cell.
+
+        Cells are assigned in order by backtracking. The ways to complete
+        an assignment from the `n`th cell on depend only on how many mines
+        the sentences spanning that point still need, so they are counted
+        once for each such state.
+        """
+        index = {cell: n for n, cell in enumerate(cells)}
+
+        # For each sentence, the mines still needed and cells still free,
+        # and for each cell, the sentences it appears in
+        needed = [sentence.count for sentence in sentences]
+        free = [len(sentence.cells) for sentence in sentences]
+        constraints = [[] for _ in cells]
+        for c, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                constraints[index[cell]].append(c)
+
+        # Sentences with cells both before and from each cell on
+        spans = [
+            (min(index[cell] for cell in sentence.cells),
+             max(index[cell] for cell in sentence.cells))
+            for sentence in sentences
+        ]
+        open_at = [
+            [c for c, (first, last) in enumerate(spans) if first < n <= last]
+            for n in range(len(cells))
+        ]
+
+        memo = dict()
+
+        def complete(n):
+            """
+            Returns a dictionary mapping each number of mines `k` among
+            the cells from the `n`th on to the number of ways to place
+            them, and how many of those place a mine in each such cell.
+            """
+            if n == len(cells):
+                return {0: (1, [])}
+            key = n, tuple(needed[c] for c in open_at[n])
+            if key in memo:
+                return memo[key]
+
+            ways = dict()
+            for value in (0, 1):
+                for c in constraints[n]:
+                    needed[c] -= value
+                    free[c] -= 1
+                if all(0 <= needed[c] <= free[c] for c in constraints[n]):
+                    for k, (total, counts) in complete(n + 1).items():
+                        counts = [total * value] + counts
+                        if k + value in ways:
+                            previous, previous_counts = ways[k + value]
+                            total += previous
+                            counts = [
+                                a + b for a, b in zip(previous_counts, counts)
+                            ]
+                        ways[k + value] = (total, counts)
+                for c in constraints[n]:
+                    needed[c] += value
+                    free[c] += 1
+
+            memo[key] = ways
+            return ways
+
+        return complete(0)
 
     def make_safe_move(self):
         """
@@ -286,13 +464,114 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        Chooses at random among the cells least likely to be mines,
+        according to `mine_probabilities`.
         """
-        if not self.knowledge:
-            i, j = random.randint(0, 7), random.randint(0, 7)
-            return (i, j)
-        for sentence in self.knowledge:
-            for move in sentence.cells:
-                if move not in self.moves_made and move not in self.mines and len(sentence.cells) != sentence.count:
-                    return move
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        lowest = min(probabilities.values())
+        return random.choice(sorted(
+            cell for cell, probability in probabilities.items()
+            if probability <= lowest + 1e-12
+        ))
 
-        return None
+    def mine_probabilities(self):
+        """
+        Returns a dictionary mapping each cell that has not been chosen
+        and is not known to be a mine to the probability that it is a
+        mine, given the knowledge base and the number of mines left.
+
+        Every way of placing mines in the components of the knowledge
+        base is weighted by the number of ways of placing the remaining
+        mines among the cells outside them. The result is kept until the
+        knowledge base changes.
+        """
+        if self.probabilities is not None:
+            return self.probabilities
+
+        unknown = {
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        }
+        probabilities = {cell: 0 for cell in unknown & self.safes}
+        components = [
+            self.component_solutions(cells, sentences)
+            for cells, sentences in self.frontier_components()
+        ]
+        others = unknown - self.safes - set(itertools.chain.from_iterable(
+            cells for cells, _ in components
+        ))
+        remaining = self.mine_count - len(self.mines)
+
+        def rest(mines, cells=len(others)):
+            """Ways to place the other mines among `cells` other cells."""
+            if mines < 0:
+                return 0
+            return math.comb(cells, mines)
+
+        def convolve(a, b):
+            """Distribution of the sum of two numbers of mines."""
+            c = dict()
+            for x, ways_x in a.items():
+                for y, ways_y in b.items():
+                    c[x + y] = c.get(x + y, 0) + ways_x * ways_y
+            return c
+
+        # Ways to place each number of mines in the components before and
+        # after each one
+        totals = [
+            {k: total for k, (total, _) in ways.items()}
+            for _, ways in components
+        ]
+        before = [{0: 1}]
+        for distribution in totals:
+            before.append(convolve(before[-1], distribution))
+        after = [{0: 1}]
+        for distribution in reversed(totals):
+            after.append(convolve(after[-1], distribution))
+        after.reverse()
+
+        weight = sum(
+            ways * rest(remaining - t) for t, ways in before[-1].items()
+        )
+        if weight == 0:
+            # The count of mines is inconsistent with the knowledge base,
+            # so use each component's own distribution
+            for cells, ways in components:
+                solutions = sum(total for total, _ in ways.values())
+                for n, cell in enumerate(cells):
+                    mines = sum(counts[n] for _, counts in ways.values())
+                    probabilities[cell] = mines / solutions
+            density = remaining / len(others) if others else 0
+            for cell in others:
+                probabilities[cell] = min(max(density, 0), 1)
+            self.probabilities = probabilities
+            return probabilities
+
+        for i, (cells, ways) in enumerate(components):
+            excluding = convolve(before[i], after[i + 1])
+            mines = [0] * len(cells)
+            for k, (_, counts) in ways.items():
+                weight_k = sum(
+                    ways_t * rest(remaining - k - t)
+                    for t, ways_t in excluding.items()
+                )
+                for n, count in enumerate(counts):
+                    mines[n] += count * weight_k
+            for n, cell in enumerate(cells):
+                probabilities[cell] = mines[n] / weight
+
+        if others:
+            mines = sum(
+                ways * rest(remaining - t - 1, len(others) - 1)
+                for t, ways in before[-1].items()
+            )
+            for cell in others:
+                probabilities[cell] = mines / weight
+
+        self.probabilities = probabilities
+        return probabilities
@@ -0,0 +1,359 @@
+"""
+Benchmark the PageRank implementations in pagerank.py on synthetic corpora.
+
+Usage: python benchmark.py [--sizes N [N ...]] [--results FILE]
+                           [--baseline FILE] [--tolerance T]
+
+Synthetic corpora have power-law (Zipf) in- and out-degree distributions.
+They are generated as link graphs in compressed sparse row arrays, and
+converted to the dictionary format `crawl` returns (and written as a
+directory of HTML pages, to exercise `crawl`) only for sizes that some
+engine is run on. Every engine is timed, its peak memory recorded and
+its ranks compared against a reference power-iteration solution,
+computed with NumPy over the arrays.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import pagerank
+
+# Corpus sizes in pages; graphs are generated as NumPy arrays, and at
+# 10M pages generating one and computing its reference ranks take about
+# 45 seconds and 2 GiB
+SIZES = [1000, 10000, 100000, 1000000, 10000000]
+SEED = 0
+
+# Exponents of the power-law degree distributions
+OUT_EXPONENT = 2.1
+IN_EXPONENT = 1.0
+
+# Cap on the number of links on a single page
+MAX_LINKS = 1000
+
+# Pages whose links are drawn at once when generating a graph
+BLOCK_PAGES = 1 << 20
+
+# Largest corpus each engine is run on; the original implementations
+# are quadratic (iteration) or take time proportional to the pages times
+# the samples (sampling), each engine is run twice by `measure`, and
+# writing millions of HTML files is dominated by the file system
+ENGINES = [
+    ("crawl", lambda corpus, directory: pagerank.crawl(directory), 100000),
+    ("sample_pagerank", lambda corpus, directory: pagerank.sample_pagerank(
+        corpus, pagerank.DAMPING, pagerank.SAMPLES), 10000),
+    ("iterate_pagerank", lambda corpus, directory: pagerank.iterate_pagerank(
+        corpus, pagerank.DAMPING), 2000),
+]
+
+
+def page_name(i):
+    """Return the file name of the `i`th synthetic page."""
+    return f"{i}.html"
+
+
+def generate_graph(n, seed=SEED):
+    """
+    Return a synthetic link graph of `n` pages as NumPy arrays
+    `(offsets, targets)` in compressed sparse row form, so that page `i`
+    links to pages `targets[offsets[i]:offsets[i + 1]]`.
+
+    Out-degrees are drawn from a discrete power law with exponent
+    `OUT_EXPONENT`, and link targets are drawn with Zipf weights of
+    exponent `IN_EXPONENT` over a random permutation of the pages, so
+    that in-degrees are power-law distributed too. Every page links to
+    at least one other page (if there is one) and never to itself.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = rng.permutation(n)
+    cum_weights = np.cumsum(1 / np.arange(1, n + 1) ** IN_EXPONENT)
+    degrees = np.floor((1 - rng.random(n)) ** (-1 / (OUT_EXPONENT - 1)))
+    degrees = np.minimum(
+        degrees, min(MAX_LINKS, max(n // 2, 1), n - 1)
+    ).astype(np.int64)
+
+    # Pages are given their links a block at a time, to bound the memory
+    # used by temporary arrays, and links are stored in the smallest
+    # integer type that holds every page
+    dtype = np.min_scalar_type(max(n - 1, 0))
+    blocks = [np.empty(0, dtype)]
+    for low in range(0, n, BLOCK_PAGES):
+        high = min(low + BLOCK_PAGES, n)
+        blocks.append(draw_links(
+            rng, np.arange(low, high), degrees[low:high], popularity,
+            cum_weights
+        ).astype(dtype))
+
+    offsets = np.zeros(n + 1, np.int64)
+    np.cumsum(degrees, out=offsets[1:])
+    return offsets, np.concatenate(blocks)
+
+
+def draw_links(rng, pages, degrees, popularity, cum_weights):
+    """
+    Return the targets of the links of each of `pages` in turn, drawing
+    `degrees[k]` distinct pages other than `pages[k]` for each with the
+    Zipf weights of `generate_graph`.
+
+    Links are drawn in rounds, each drawing the links that every page is
+    still missing and dropping links to itself and repeated links, and
+    pages with all their links are set aside so later rounds stay small.
+    """
+    n = len(popularity)
+    sources = targets = np.empty(0, np.int64)
+    complete = [(sources, targets)]
+    active = degrees > 0
+    missing = degrees
+    while missing.any():
+        drawing = np.repeat(np.arange(len(pages)), missing)
+        ranks = np.searchsorted(
+            cum_weights, rng.random(len(drawing)) * cum_weights[-1],
+            side="right"
+        )
+        drawn = popularity[np.minimum(ranks, n - 1)]
+        distinct = drawn != pages[drawing]
+        sources = np.concatenate([sources, drawing[distinct]])
+        targets = np.concatenate([targets, drawn[distinct]])
+        _, first = np.unique(sources * n + targets, return_index=True)
+        first.sort()
+        sources, targets = sources[first], targets[first]
+
+        missing = np.where(
+            active, degrees - np.bincount(sources, minlength=len(pages)), 0
+        )
+        active &= missing > 0
+        done = ~active[sources]
+        complete.append((sources[done], targets[done]))
+        sources, targets = sources[~done], targets[~done]
+
+    sources = np.concatenate([s for s, _ in complete])
+    targets = np.concatenate([t for _, t in complete])
+    return targets[np.argsort(sources, kind="stable")]
+
+
+def graph_corpus(graph):
+    """
+    Return the link graph `graph`, returned by `generate_graph`, in the
+    format returned by `pagerank.crawl`.
+    """
+    offsets, targets = graph
+    targets = targets.tolist()
+    return {
+        page_name(page): {
+            page_name(link) for link in targets[offsets[page]:offsets[page + 1]]
+        }
+        for page in range(len(offsets) - 1)
+    }
+
+
+def generate_corpus(n, seed=SEED):
+    """
+    Return a synthetic link graph of `n` pages, in the format returned
+    by `pagerank.crawl`.
+    """
+    return graph_corpus(generate_graph(n, seed))
+
+
+def write_corpus(corpus, directory):
+    """
+    Write `corpus` to `directory` as HTML pages that `pagerank.crawl`
+    parses back into the same link graph.
+    """
+    for page, links in corpus.items():
+        anchors = "\n".join(
+            f'            <li><a href="{link}">{link}</a></li>'
+            for link in sorted(links)
+        )
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(
+                "<!DOCTYPE html>\n<html lang=\"en\">\n    <body>\n"
+                f"        <h1>{page}</h1>\n        <ul>\n{anchors}\n"
+                "        </ul>\n    </body>\n</html>\n"
+            )
+
+
+def reference_pagerank(graph, damping_factor, tolerance=1e-12):
+    """
+    Return exact PageRank values for `graph`, returned by
+    `generate_graph`, as an array indexed by page, by power iteration
+    over its links, treating pages without links as linking to every
+    page.
+    """
+    offsets, targets = graph
+    n = len(offsets) - 1
+    out_degree = np.diff(offsets)
+    sources = np.repeat(np.arange(n, dtype=targets.dtype), out_degree)
+    dangling = out_degree == 0
+
+    ranks = np.full(n, 1 / n)
+    while True:
+        share = np.divide(
+            ranks, out_degree, out=np.zeros(n), where=~dangling
+        )
+        base = (1 - damping_factor) / n + damping_factor * ranks[dangling].sum() / n
+        new_ranks = base + damping_factor * np.bincount(
+            targets, weights=share[sources], minlength=n
+        )
+        delta = np.abs(new_ranks - ranks).max()
+        ranks = new_ranks
+        if delta < tolerance:
+            return ranks
+
+
+def max_error(ranks, reference):
+    """
+    Return the largest absolute difference between a ranking returned by
+    an engine and the array returned by `reference_pagerank`.
+    """
+    return max(
+        abs(ranks.get(page_name(page), 0) - p)
+        for page, p in enumerate(reference.tolist())
+    )
+
+
+def measure(function, *args):
+    """
+    Run `function(*args)` twice, returning its result, the wall-clock
+    time of an untraced run and the peak memory of a traced run.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def run(sizes, seed=SEED):
+    """
+    Benchmark every engine on a synthetic corpus of each size.
+    Return a list of result dictionaries, one per engine and size.
+    """
+    limits = {name: limit for name, _, limit in ENGINES}
+    results = []
+    for n in sizes:
+        start = time.perf_counter()
+        graph = generate_graph(n, seed)
+        reference = reference_pagerank(graph, pagerank.DAMPING)
+        print(f"{'reference':>18} {n:>9} pages: "
+              f"{time.perf_counter() - start:9.3f}s  {len(graph[1])} links",
+              flush=True)
+
+        # Only build the dictionary form for engines small enough to use it
+        corpus = graph_corpus(graph) if n <= max(limits.values()) else None
+
+        with tempfile.TemporaryDirectory() as directory:
+            if n <= limits["crawl"]:
+                write_corpus(corpus, directory)
+
+            for name, engine, limit in ENGINES:
+                if n > limit:
+                    results.append({"engine": name, "pages": n, "skipped": True})
+                    continue
+                try:
+                    output, elapsed, peak = measure(engine, corpus, directory)
+                except Exception as e:
+                    result = {"engine": name, "pages": n, "failed": repr(e)}
+                    results.append(result)
+                    print(f"{name:>18} {n:>9} pages: failed with {e!r}")
+                    continue
+                result = {
+                    "engine": name,
+                    "pages": n,
+                    "seconds": elapsed,
+                    "peak_bytes": peak,
+                }
+                if name == "crawl":
+                    result["correct"] = output == corpus
+                else:
+                    result["error"] = max_error(output, reference)
+                results.append(result)
+                report(result)
+    return results
+
+
+def report(result):
+    """Print a single benchmark result."""
+    line = (
+        f"{result['engine']:>18} {result['pages']:>9} pages: "
+        f"{result['seconds']:9.3f}s {result['peak_bytes'] / 2 ** 20:9.1f} MiB"
+    )
+    if "error" in result:
+        line += f"  max error {result['error']:.2e}"
+    if "correct" in result:
+        line += "  ok" if result["correct"] else "  MISMATCH"
+    print(line, flush=True)
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Return descriptions of results that are slower than `tolerance`
+    times, or less accurate than, the matching entry in `baseline`.
+    """
+    previous = {(r["engine"], r["pages"]): r for r in baseline}
+    found = []
+    for result in results:
+        old = previous.get((result["engine"], result["pages"]))
+        if not old or "seconds" not in old:
+            continue
+        if "seconds" not in result:
+            found.append(f"{result['engine']} ({result['pages']} pages) "
+                         f"did not complete: {result.get('failed', 'skipped')}")
+            continue
+        if result["seconds"] > old["seconds"] * tolerance:
+            found.append(
+                f"{result['engine']} ({result['pages']} pages) took "
+                f"{result['seconds']:.3f}s, baseline {old['seconds']:.3f}s"
+            )
+        if result.get("correct") is False:
+            found.append(f"{result['engine']} ({result['pages']} pages) "
+                         "parsed the corpus incorrectly")
+        if "error" in old and result["error"] > max(old["error"] * tolerance, 1e-4):
+            found.append(
+                f"{result['engine']} ({result['pages']} pages) error "
+                f"{result['error']:.2e}, baseline {old['error']:.2e}"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="corpus sizes to benchmark, in pages")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--results", help="write results to this JSON file")
+    parser.add_argument("--baseline",
+                        help="compare against results from a previous run")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown relative to the baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.seed)
+
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"Regression: {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -125,7 +125,8 @@ def sample_pagerank(corpus, damping_factor, n):
             key = random_link[0]
 
     for link in corpus:
-        pageRank[link] = (frequency[link] / n)
+        # Pages the sampler never visits have a rank of zero
+        pageRank[link] = (frequency.get(link, 0) / n)
 
     return pageRank
 